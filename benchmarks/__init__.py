@@ -0,0 +1 @@
+"""Benchmarks for the Eheim Digital package."""
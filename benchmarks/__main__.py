@@ -0,0 +1,53 @@
+"""Run the benchmarks and print the results as JSON.
+
+Run with ``python -m benchmarks``, optionally naming the benchmarks to run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import platform
+from typing import TYPE_CHECKING, Any
+
+from eheimdigital import __version__
+
+from . import codec, hotpaths, importtime, replay
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+BENCHMARKS: dict[str, Callable[[], dict[str, Any]]] = {
+    "codec": codec.run,
+    "hotpaths": hotpaths.run,
+    "importtime": importtime.run,
+    "replay": replay.run,
+}
+
+
+def main() -> None:
+    """Parse the command line, run the benchmarks and output the results."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    _ = parser.add_argument(
+        "benchmarks", nargs="*", choices=list(BENCHMARKS), help="default: all"
+    )
+    _ = parser.add_argument("-o", "--output", type=Path, help="write to a file")
+    args = parser.parse_args()
+    results = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "benchmarks": {
+            name: BENCHMARKS[name]() for name in args.benchmarks or BENCHMARKS
+        },
+    }
+    encoded = json.dumps(results, indent=2)
+    if args.output is None:
+        print(encoded)  # noqa: T201
+    else:
+        _ = args.output.write_text(f"{encoded}\n", encoding="utf8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark the JSON codecs on typical websocket frames.
+
+Run with ``python -m benchmarks.codec``.
+"""
+
+from __future__ import annotations
+
+from functools import partial
+import json
+from pathlib import Path
+import timeit
+from typing import Any
+
+from eheimdigital.codec import msgspec_codec, orjson_codec, stdlib_codec
+
+FIXTURES = Path(__file__).parents[1] / "tests" / "fixtures"
+CODECS = {"json": stdlib_codec, "orjson": orjson_codec, "msgspec": msgspec_codec}
+
+
+def sample_frame() -> list[dict[str, Any]]:
+    """Return a frame with one packet of every fixture."""
+    return [
+        json.loads(path.read_text(encoding="utf8"))
+        for path in sorted(FIXTURES.glob("*.json"))
+    ]
+
+
+def run(number: int = 20000) -> dict[str, Any]:
+    """Measure frames per second decoded and encoded by each installed codec."""
+    frame = sample_frame()
+    encoded = json.dumps(frame)
+    results: dict[str, Any] = {"frame_bytes": len(encoded), "codecs": {}}
+    for name, codec in CODECS.items():
+        try:
+            loads, dumps = codec()
+        except ImportError:
+            continue
+        results["codecs"][name] = {
+            "decode_per_s": number
+            / timeit.timeit(partial(loads, encoded), number=number),
+            "encode_per_s": number
+            / timeit.timeit(partial(dumps, frame), number=number),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))  # noqa: T201
@@ -0,0 +1,185 @@
+"""Benchmark the parse, dispatch and serialization hot paths of the hub.
+
+Run with ``python -m benchmarks.hotpaths``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+from itertools import cycle, islice
+import json
+import random
+from time import perf_counter
+import tracemalloc
+from typing import TYPE_CHECKING, Any
+
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.simulator import SIMULATED_DEVICE_TYPES, SimulatedDevice
+from eheimdigital.types import UsrDtaPacket
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from eheimdigital.device import EheimDigitalDevice
+
+FLEET_DEVICES_PER_TYPE = (2, 20, 200)
+
+
+class NullWebSocket:
+    """Websocket that encodes the sent frames and discards them."""
+
+    closed = False
+
+    @staticmethod
+    async def send_json(data: Any, *, dumps: Callable[[Any], str]) -> None:  # noqa: ANN401
+        """Encode a frame like aiohttp does, without sending it."""
+        _ = dumps(data)
+
+
+def sample_packets(device: SimulatedDevice, count: int) -> list[dict[str, Any]]:
+    """Return count data packets of a device with drifting values."""
+    rng = random.Random(0)  # noqa: S311
+    packets = list(device.packets.values())
+    while len(packets) < count:
+        packets.extend(device.drift(rng))
+    return packets[:count]
+
+
+async def populated_hub(devices_per_type: int) -> EheimDigitalHub:
+    """Return a hub with simulated devices that have received their data packets."""
+    hub = EheimDigitalHub()
+    for index in range(devices_per_type):
+        for device_type in SIMULATED_DEVICE_TYPES:
+            simulated = SimulatedDevice(device_type, index)
+            await hub.add_device(UsrDtaPacket(**simulated.usrdta))
+            for packet in simulated.packets.values():
+                await hub.parse_message(packet)
+    return hub
+
+
+def public_properties(device: EheimDigitalDevice) -> list[str]:
+    """Return the names of the properties that can be read on a device."""
+    names = []
+    for name in dir(type(device)):
+        if name.startswith("_") or callable(getattr(device, name, None)):
+            continue
+        try:
+            _ = getattr(device, name)
+        except Exception:  # noqa: BLE001, S112
+            continue
+        names.append(name)
+    return names
+
+
+async def measure_parse(number: int) -> dict[str, Any]:
+    """Measure the packets per second parsed by the hub, per device type."""
+    results: dict[str, Any] = {}
+    for device_type in SIMULATED_DEVICE_TYPES:
+        simulated = SimulatedDevice(device_type, 0)
+        hub = EheimDigitalHub()
+        await hub.add_device(UsrDtaPacket(**simulated.usrdta))
+        changing = sample_packets(simulated, number)
+        unchanged = list(islice(cycle(simulated.packets.values()), number))
+        for packet in unchanged:
+            await hub.parse_message(packet)
+        timings = {}
+        for name, packets in (("changed", changing), ("unchanged", unchanged)):
+            start = perf_counter()
+            for packet in packets:
+                await hub.parse_message(packet)
+            timings[f"{name}_per_s"] = number / (perf_counter() - start)
+        results[device_type.name] = timings
+    return results
+
+
+async def measure_send(number: int) -> dict[str, Any]:
+    """Measure the packets per second encoded by send_packet."""
+    hub = await populated_hub(1)
+    hub.ws = NullWebSocket()  # type: ignore[assignment]
+    results: dict[str, Any] = {}
+    for device in hub.devices.values():
+        packet = {"title": "GET_USRDTA", "to": device.mac_address, "from": "USER"}
+        start = perf_counter()
+        for _ in range(number):
+            await hub.send_packet(packet)
+        results[device.device_type.name] = number / (perf_counter() - start)
+    return {"packets_per_s": results}
+
+
+async def measure_properties(number: int) -> dict[str, Any]:
+    """Measure the nanoseconds per property read on populated devices."""
+    hub = await populated_hub(1)
+    results: dict[str, Any] = {}
+    for device in hub.devices.values():
+        names = public_properties(device)
+        start = perf_counter()
+        for _ in range(number):
+            for name in names:
+                _ = getattr(device, name)
+        results[device.device_type.name] = {
+            "properties": len(names),
+            "ns_per_read": (perf_counter() - start) * 1e9 / (number * len(names)),
+        }
+    return results
+
+
+async def measure_as_dict(number: int) -> dict[str, Any]:
+    """Measure as_dict and its JSON encoding for fleets of increasing size."""
+    results: dict[str, Any] = {}
+    for devices_per_type in FLEET_DEVICES_PER_TYPE:
+        hub = await populated_hub(devices_per_type)
+        repeat = max(number * 10 // len(hub.devices), 1)
+        start = perf_counter()
+        for _ in range(repeat):
+            _ = hub.as_dict()
+        as_dict_s = (perf_counter() - start) / repeat
+        start = perf_counter()
+        for _ in range(repeat):
+            _ = hub.json_dumps(hub.as_dict())
+        results[str(len(hub.devices))] = {
+            "as_dict_ms": as_dict_s * 1e3,
+            "as_dict_json_ms": (perf_counter() - start) / repeat * 1e3,
+        }
+    return results
+
+
+async def measure_memory(devices_per_type: int) -> dict[str, Any]:
+    """Measure the bytes allocated per populated device, per device type."""
+    results: dict[str, Any] = {}
+    for device_type in SIMULATED_DEVICE_TYPES:
+        simulated = [
+            SimulatedDevice(device_type, index) for index in range(devices_per_type)
+        ]
+        hub = EheimDigitalHub()
+        _ = gc.collect()
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        for device in simulated:
+            await hub.add_device(UsrDtaPacket(**device.usrdta))
+            for packet in device.packets.values():
+                await hub.parse_message(dict(packet))
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[device_type.name] = (after - before) // devices_per_type
+    return {"bytes_per_device": results}
+
+
+async def measure(number: int) -> dict[str, Any]:
+    """Run all hot path benchmarks."""
+    return {
+        "parse_message": await measure_parse(number),
+        "send_packet": await measure_send(number),
+        "properties": await measure_properties(number // 10),
+        "as_dict": await measure_as_dict(number // 10),
+        "memory": await measure_memory(100),
+    }
+
+
+def run(number: int = 10000) -> dict[str, Any]:
+    """Measure the hot paths, with number packets per parse benchmark."""
+    return asyncio.run(measure(number))
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))  # noqa: T201
@@ -0,0 +1,47 @@
+"""Benchmark the import time of the eheimdigital modules.
+
+Run with ``python -m benchmarks.importtime``.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess  # noqa: S404
+import sys
+from typing import Any
+
+MODULES = ("eheimdigital.types", "eheimdigital.hub", "eheimdigital.fleet")
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Return the cumulative import time in microseconds of every imported module.
+
+    The module is imported in a fresh interpreter with ``-X importtime``.
+    """
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def run() -> dict[str, Any]:
+    """Measure the import time and the number of imported modules of each module."""
+    results: dict[str, Any] = {}
+    for module in MODULES:
+        times = import_times(module)
+        results[module] = {"import_us": times[module], "modules": len(times)}
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))  # noqa: T201
@@ -0,0 +1,76 @@
+"""Benchmark replaying captured websocket traffic through the hub.
+
+Run with ``python -m benchmarks.replay [capture]``. Without a capture file, one
+is recorded from simulated devices first.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+import random
+import sys
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING, Any
+
+from eheimdigital.capture import CaptureRecorder
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.simulator import EheimDigitalSimulator
+from eheimdigital.types import FrameDirection, MsgTitle
+
+if TYPE_CHECKING:
+    from os import PathLike
+
+
+def record_sample(
+    path: str | PathLike[str], devices_per_type: int = 20, pushes: int = 100
+) -> None:
+    """Record the discovery of simulated devices and pushes rounds of their data."""
+    simulator = EheimDigitalSimulator(devices_per_type=devices_per_type)
+    recorder = CaptureRecorder(path, "simulator")
+    rng = random.Random(0)  # noqa: S311
+
+    def record(packet: dict[str, Any]) -> None:
+        recorder.record(FrameDirection.INBOUND, simulator.json_dumps(packet))
+
+    record({
+        "title": MsgTitle.MESH_NETWORK,
+        "from": simulator.master.mac_address,
+        "clientList": list(simulator.devices),
+        "to": "USER",
+    })
+    for device in simulator.devices.values():
+        record(device.usrdta)
+    for _ in range(pushes):
+        for device in simulator.devices.values():
+            for packet in device.drift(rng):
+                record(packet)
+    recorder.close()
+
+
+async def measure(path: str | PathLike[str]) -> dict[str, Any]:
+    """Replay a capture as fast as possible."""
+    hub = EheimDigitalHub()
+    result = await hub.replay(path, speed=None)
+    return {
+        "devices": len(hub.devices),
+        "frames": result.frames,
+        "packets": result.packets,
+        "elapsed_s": result.elapsed,
+        "packets_per_s": result.packets / result.elapsed,
+    }
+
+
+def run(path: str | PathLike[str] | None = None) -> dict[str, Any]:
+    """Measure the packets per second replayed from a capture file."""
+    if path is not None:
+        return asyncio.run(measure(path))
+    with TemporaryDirectory() as directory:
+        sample = Path(directory) / "sample.capture"
+        record_sample(sample)
+        return asyncio.run(measure(sample))
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(*sys.argv[1:2]), indent=2))  # noqa: T201
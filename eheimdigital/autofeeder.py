@@ -5,15 +5,29 @@ from __future__ import annotations
 from logging import getLogger
 from typing import TYPE_CHECKING, Any, override
 
-from eheimdigital.device import EheimDigitalDevice
-from eheimdigital.types import FeederDataPacket, FeederDrumState, MsgTitle, UsrDtaPacket
+from eheimdigital.device import (
+    EheimDigitalDevice,
+    coalesced_write,
+    optimistic_write,
+    packet_handler,
+)
+from eheimdigital.registry import register_device
+from eheimdigital.types import (
+    EheimDeviceType,
+    FeederDataPacket,
+    FeederDrumState,
+    MsgTitle,
+    UsrDtaPacket,
+)
 
 if TYPE_CHECKING:
     from eheimdigital.hub import EheimDigitalHub
+    from eheimdigital.types import FieldChange
 
 _LOGGER = getLogger(__package__)
 
 
+@register_device(EheimDeviceType.VERSION_EHEIM_FEEDER)
 class EheimDigitalAutofeeder(EheimDigitalDevice):
     """EHEIM autofeeder+ auto feeder."""
 
@@ -23,21 +37,20 @@ class EheimDigitalAutofeeder(EheimDigitalDevice):
         """Initialize the EHEIM autofeeder+ auto feeder."""
         super().__init__(hub, usrdta)
 
-    @override
-    async def parse_message(self, msg: dict[str, Any]) -> None:
-        """Parse a message."""
-        if msg["title"] == MsgTitle.FEEDER_DATA:
-            self.feeder_data = FeederDataPacket(**msg)
+    @packet_handler(MsgTitle.FEEDER_DATA, request=MsgTitle.GET_FEEDER_DATA)
+    def parse_feeder_data(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+        """Parse a FEEDER_DATA packet."""
+        return self.update_packet("feeder_data", FeederDataPacket(**msg))
 
     @override
-    async def update(self) -> None:
+    async def update(self, *, wait: bool = False) -> None:
         """Get the new feeder state."""
-        await self.hub.send_packet({
-            "title": MsgTitle.GET_FEEDER_DATA,
-            "to": self.mac_address,
-            "from": "USER",
-        })
+        await self.request_data(
+            MsgTitle.GET_FEEDER_DATA, MsgTitle.FEEDER_DATA, wait=wait
+        )
 
+    @optimistic_write("feeder_data")
+    @coalesced_write
     async def set_feeder_data(self, data: dict[str, Any]) -> None:
         """Send a SET_FEEDER_DATA packet, containing new values from data."""
         if self.feeder_data is None:
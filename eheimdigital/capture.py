@@ -0,0 +1,152 @@
+"""Recording and replaying of the websocket traffic of a hub.
+
+A capture file has one line per frame: the seconds since the recording
+started, the direction of the frame and the frame as sent on the wire, for
+example ``12.345678 < {"title": "HEATER_DATA", ...}``. Every recording session
+starts with a comment line. Captures are appended to, and gzipped if the path
+ends with .gz.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import closing
+from datetime import UTC, datetime
+import gzip
+from itertools import islice
+from logging import getLogger
+from pathlib import Path
+from queue import SimpleQueue
+from threading import Thread
+from time import monotonic
+from typing import TYPE_CHECKING, NamedTuple, TextIO
+
+from .types import FrameDirection, ReplayResult
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from os import PathLike
+
+    from .hub import EheimDigitalHub
+
+_LOGGER = getLogger(__package__)
+
+REPLAY_CHUNK_SIZE = 1000
+
+
+class CaptureRecord(NamedTuple):
+    """Represent a recorded frame."""
+
+    time: float
+    direction: FrameDirection
+    data: str
+
+
+def open_capture(path: Path, mode: str) -> TextIO:
+    """Open a capture file in text mode, gzipped if the path ends with .gz."""
+    if path.suffix == ".gz":
+        return gzip.open(path, f"{mode}t", encoding="utf8")  # type: ignore[return-value]
+    return path.open(mode, encoding="utf8")
+
+
+class CaptureRecorder:
+    """Append the frames of a hub connection to a capture file.
+
+    The frames are queued and written by a thread, which opens the file on the
+    first recorded frame. close waits until the queued frames are written.
+    """
+
+    host: str
+    path: Path
+    recorded: int
+
+    def __init__(self, path: str | PathLike[str], host: str) -> None:
+        """Initialize a recorder."""
+        self._queue: SimpleQueue[str | None] = SimpleQueue()
+        self._started = monotonic()
+        self._thread: Thread | None = None
+        self.host = host
+        self.path = Path(path)
+        self.recorded = 0
+
+    def record(self, direction: FrameDirection, data: str) -> None:
+        """Queue a frame to be appended to the capture."""
+        if self._thread is None:
+            self._queue.put(
+                f"# eheimdigital {self.host} {datetime.now(UTC).isoformat()}\n"
+            )
+            self._thread = Thread(
+                target=self.write_lines, name=f"capture {self.path}", daemon=True
+            )
+            self._thread.start()
+        self._queue.put(f"{monotonic() - self._started:.6f} {direction} {data}\n")
+        self.recorded += 1
+
+    def write_lines(self) -> None:
+        """Open the capture file and write the queued lines until closed."""
+        try:
+            with open_capture(self.path, "a") as file:
+                while (line := self._queue.get()) is not None:
+                    _ = file.write(line)
+        except OSError:
+            _LOGGER.exception("Could not write the capture %s", self.path)
+            while self._queue.get() is not None:
+                pass
+
+    def close(self) -> None:
+        """Write the queued frames and close the capture file, blocking until done."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+def read_capture(path: str | PathLike[str]) -> Iterator[CaptureRecord]:
+    """Read the recorded frames of a capture file, skipping comment lines.
+
+    Yields:
+        The recorded frames, in the order they were recorded.
+
+    """
+    with open_capture(Path(path), "r") as file:
+        for line in file:
+            if not line.strip() or line.startswith("#"):
+                continue
+            time, direction, data = line.rstrip("\n").split(" ", 2)
+            yield CaptureRecord(float(time), FrameDirection(direction), data)
+
+
+async def replay_capture(
+    hub: EheimDigitalHub, path: str | PathLike[str], speed: float | None
+) -> ReplayResult:
+    """Feed the received frames of a capture to a hub.
+
+    The frames are replayed speed times faster than recorded, or as fast as
+    possible if speed is None. A recording appended by a later session continues
+    right after the previous one.
+    """
+    result = ReplayResult()
+    start = hub.loop.time()
+    previous: float | None = None
+    with closing(read_capture(path)) as records:
+        while chunk := await hub.loop.run_in_executor(
+            None, list, islice(records, REPLAY_CHUNK_SIZE)
+        ):
+            for record in chunk:
+                if previous is not None:
+                    result.span += max(record.time - previous, 0.0)
+                previous = record.time
+                if record.direction == FrameDirection.OUTBOUND:
+                    result.sent += 1
+                    continue
+                if (
+                    speed is not None
+                    and (delay := start + result.span / speed - hub.loop.time()) > 0
+                ):
+                    await asyncio.sleep(delay)
+                frame = hub.json_loads(record.data)
+                result.frames += 1
+                result.packets += len(frame) if isinstance(frame, list) else 1
+                await hub.handle_frame(frame)
+    result.elapsed = hub.loop.time() - start
+    return result
@@ -2,16 +2,25 @@
 
 from __future__ import annotations
 
+import asyncio
+from functools import cached_property
 import json
 from logging import getLogger
 from typing import TYPE_CHECKING, Any, override
 
-from eheimdigital.device import EheimDigitalDevice
+from eheimdigital.device import (
+    EheimDigitalDevice,
+    coalesced_write,
+    optimistic_write,
+    packet_handler,
+)
+from eheimdigital.registry import register_device
 from eheimdigital.types import (
     AcclimatePacket,
     CCVPacket,
     ClockPacket,
     CloudPacket,
+    EheimDeviceType,
     LightMode,
     MoonPacket,
     MsgTitle,
@@ -20,10 +29,12 @@ from eheimdigital.types import (
 
 if TYPE_CHECKING:
     from eheimdigital.hub import EheimDigitalHub
+    from eheimdigital.types import FieldChange
 
 _LOGGER = getLogger(__package__)
 
 
+@register_device(EheimDeviceType.VERSION_EHEIM_CLASSIC_LED_CTRL_PLUS_E)
 class EheimDigitalClassicLEDControl(EheimDigitalDevice):
     """Represent a EHEIM classicLEDcontrol light controller."""
 
@@ -32,64 +43,65 @@ class EheimDigitalClassicLEDControl(EheimDigitalDevice):
     cloud: CloudPacket | None = None
     moon: MoonPacket | None = None
     acclimate: AcclimatePacket | None = None
-    tankconfig: list[list[str]]
-    power: list[list[int]]
 
     def __init__(self, hub: EheimDigitalHub, usrdta: UsrDtaPacket) -> None:
         """Initialize a classicLEDcontrol light controller."""
         super().__init__(hub, usrdta)
-        self.tankconfig = json.loads(usrdta["tankconfig"])
-        self.power = json.loads(usrdta["power"])
 
-    @override
-    async def parse_message(self, msg: dict[str, Any]) -> None:
-        """Parse a message."""
-        match msg["title"]:
-            case MsgTitle.CCV:
-                self.ccv = CCVPacket(**msg)
-            case MsgTitle.CLOUD:
-                self.cloud = CloudPacket(**msg)
-            case MsgTitle.MOON:
-                self.moon = MoonPacket(**msg)
-            case MsgTitle.CLOCK:
-                self.clock = ClockPacket(**msg)
-            case MsgTitle.ACCLIMATE:
-                self.acclimate = AcclimatePacket(**msg)
-            case _:
-                pass
+    @cached_property
+    def tankconfig(self) -> list[list[str]]:
+        """Return the LED bars connected to the channels."""
+        return json.loads(self.usrdta["tankconfig"])
+
+    @cached_property
+    def power(self) -> list[list[int]]:
+        """Return the power of the LED bars connected to the channels."""
+        return json.loads(self.usrdta["power"])
+
+    @packet_handler(MsgTitle.CCV, request=MsgTitle.REQ_CCV)
+    def parse_ccv(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+        """Parse a CCV packet."""
+        return self.update_packet("ccv", CCVPacket(**msg))
+
+    @packet_handler(MsgTitle.CLOUD, request=MsgTitle.GET_CLOUD)
+    def parse_cloud(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+        """Parse a CLOUD packet."""
+        return self.update_packet("cloud", CloudPacket(**msg))
+
+    @packet_handler(MsgTitle.MOON, request=MsgTitle.GET_MOON)
+    def parse_moon(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+        """Parse a MOON packet."""
+        return self.update_packet("moon", MoonPacket(**msg))
+
+    @packet_handler(MsgTitle.CLOCK, request=MsgTitle.GET_CLOCK)
+    def parse_clock(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+        """Parse a CLOCK packet."""
+        return self.update_packet("clock", ClockPacket(**msg))
+
+    @packet_handler(MsgTitle.ACCLIMATE, request=MsgTitle.GET_ACCL)
+    def parse_acclimate(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+        """Parse an ACCLIMATE packet."""
+        return self.update_packet("acclimate", AcclimatePacket(**msg))
 
     @override
-    async def update(self) -> None:
+    async def update(self, *, wait: bool = False) -> None:
         """Get the new light state."""
-        await self.hub.send_packet({
-            "title": "REQ_CCV",
-            "to": self.mac_address,
-            "from": "USER",
-        })
-        await self.hub.send_packet({
-            "title": "GET_CLOCK",
-            "to": self.mac_address,
-            "from": "USER",
-        })
+        requests = [
+            (MsgTitle.REQ_CCV, MsgTitle.CCV),
+            (MsgTitle.GET_CLOCK, MsgTitle.CLOCK),
+        ]
         if "moon" not in self.__dict__:
-            await self.hub.send_packet({
-                "title": "GET_MOON",
-                "to": self.mac_address,
-                "from": "USER",
-            })
+            requests.append((MsgTitle.GET_MOON, MsgTitle.MOON))
         if "cloud" not in self.__dict__:
-            await self.hub.send_packet({
-                "title": "GET_CLOUD",
-                "to": self.mac_address,
-                "from": "USER",
-            })
+            requests.append((MsgTitle.GET_CLOUD, MsgTitle.CLOUD))
         if "acclimate" not in self.__dict__:
-            await self.hub.send_packet({
-                "title": "GET_ACCL",
-                "to": self.mac_address,
-                "from": "USER",
-            })
+            requests.append((MsgTitle.GET_ACCL, MsgTitle.ACCLIMATE))
+        _ = await asyncio.gather(
+            *(self.request_data(title, expect, wait=wait) for title, expect in requests)
+        )
 
+    @optimistic_write("cloud")
+    @coalesced_write
     async def set_cloud(self, data: dict[str, Any]) -> None:
         """Set the cloud data."""
         if self.cloud is None:
@@ -110,6 +122,8 @@ class EheimDigitalClassicLEDControl(EheimDigitalDevice):
             **data,
         })
 
+    @optimistic_write("moon")
+    @coalesced_write
     async def set_moon(self, data: dict[str, Any]) -> None:
         """Set the moon data."""
         if self.moon is None:
@@ -126,6 +140,8 @@ class EheimDigitalClassicLEDControl(EheimDigitalDevice):
             **data,
         })
 
+    @optimistic_write("acclimate")
+    @coalesced_write
     async def set_acclimate(self, data: dict[str, Any]) -> None:
         """Set the acclimate data."""
         if self.acclimate is None:
@@ -182,20 +198,25 @@ class EheimDigitalClassicLEDControl(EheimDigitalDevice):
             "from": "USER",
         })
 
+    @optimistic_write("ccv")
+    async def set_ccv(self, data: dict[str, Any]) -> None:
+        """Send a CCV-SL packet, containing new values from data."""
+        await self.hub.send_packet({
+            "title": "CCV-SL",
+            "to": self.mac_address,
+            "from": "USER",
+            **data,
+        })
+
     async def turn_on(self, value: int, channel: int) -> None:
         """Set a new brightness value for a channel."""
         if self.light_mode == LightMode.DAYCL_MODE:
             await self.set_light_mode(LightMode.MAN_MODE)
         if self.ccv is None:
             return
-        currentvalues = self.ccv["currentValues"]
+        currentvalues = list(self.ccv["currentValues"])
         currentvalues[channel] = value
-        await self.hub.send_packet({
-            "title": "CCV-SL",
-            "currentValues": currentvalues,
-            "to": self.mac_address,
-            "from": "USER",
-        })
+        await self.set_ccv({"currentValues": currentvalues})
 
     async def turn_off(self, channel: int) -> None:
         """Turn off a channel."""
@@ -203,14 +224,9 @@ class EheimDigitalClassicLEDControl(EheimDigitalDevice):
             await self.set_light_mode(LightMode.MAN_MODE)
         if self.ccv is None:
             return
-        currentvalues = self.ccv["currentValues"]
+        currentvalues = list(self.ccv["currentValues"])
         currentvalues[channel] = 0
-        await self.hub.send_packet({
-            "title": "CCV-SL",
-            "currentValues": currentvalues,
-            "to": self.mac_address,
-            "from": "USER",
-        })
+        await self.set_ccv({"currentValues": currentvalues})
 
     @property
     def cloud_probability(self) -> int | None:
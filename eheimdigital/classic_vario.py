@@ -6,9 +6,16 @@ from datetime import datetime, time, timedelta, timezone
 from logging import getLogger
 from typing import TYPE_CHECKING, Any, override
 
-from .device import EheimDigitalDevice
+from .device import (
+    EheimDigitalDevice,
+    coalesced_write,
+    optimistic_write,
+    packet_handler,
+)
+from .registry import register_device
 from .types import (
     ClassicVarioDataPacket,
+    EheimDeviceType,
     FilterErrorCode,
     FilterMode,
     MsgTitle,
@@ -17,10 +24,12 @@ from .types import (
 
 if TYPE_CHECKING:
     from eheimdigital.hub import EheimDigitalHub
+    from eheimdigital.types import FieldChange
 
 _LOGGER = getLogger(__package__)
 
 
+@register_device(EheimDeviceType.VERSION_EHEIM_CLASSIC_VARIO)
 class EheimDigitalClassicVario(EheimDigitalDevice):
     """Represent a Eheim Digital classicVARIO filter."""
 
@@ -30,21 +39,22 @@ class EheimDigitalClassicVario(EheimDigitalDevice):
         """Initialize a classicVARIO filter."""
         super().__init__(hub, usrdta)
 
-    @override
-    async def parse_message(self, msg: dict[str, Any]) -> None:
-        """Parse a message."""
-        if msg["title"] == MsgTitle.CLASSIC_VARIO_DATA:
-            self.classic_vario_data = ClassicVarioDataPacket(**msg)
+    @packet_handler(
+        MsgTitle.CLASSIC_VARIO_DATA, request=MsgTitle.GET_CLASSIC_VARIO_DATA
+    )
+    def parse_classic_vario_data(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+        """Parse a CLASSIC_VARIO_DATA packet."""
+        return self.update_packet("classic_vario_data", ClassicVarioDataPacket(**msg))
 
     @override
-    async def update(self) -> None:
+    async def update(self, *, wait: bool = False) -> None:
         """Get the new filter state."""
-        await self.hub.send_packet({
-            "title": MsgTitle.GET_CLASSIC_VARIO_DATA,
-            "to": self.mac_address,
-            "from": "USER",
-        })
+        await self.request_data(
+            MsgTitle.GET_CLASSIC_VARIO_DATA, MsgTitle.CLASSIC_VARIO_DATA, wait=wait
+        )
 
+    @optimistic_write("classic_vario_data")
+    @coalesced_write
     async def set_classic_vario_param(self, data: dict[str, Any]) -> None:
         """Send a SET_CLASSIC_VARIO_PARAM packet, containing new values from data."""
         if self.classic_vario_data is None:
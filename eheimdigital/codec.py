@@ -0,0 +1,48 @@
+"""JSON codecs for the Eheim Digital websocket traffic."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import json
+from typing import Any
+
+type JsonLoads = Callable[[str | bytes], Any]
+type JsonDumps = Callable[[Any], str]
+
+
+def stdlib_codec() -> tuple[JsonLoads, JsonDumps]:
+    """Return the codec of the json module of the standard library."""
+    return json.loads, json.dumps
+
+
+def orjson_codec() -> tuple[JsonLoads, JsonDumps]:
+    """Return the orjson codec. Raises ImportError if orjson is not installed."""
+    import orjson  # noqa: PLC0415
+
+    def dumps(obj: Any) -> str:  # noqa: ANN401
+        return orjson.dumps(obj).decode()
+
+    return orjson.loads, dumps
+
+
+def msgspec_codec() -> tuple[JsonLoads, JsonDumps]:
+    """Return the msgspec codec. Raises ImportError if msgspec is not installed."""
+    import msgspec  # noqa: PLC0415
+
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder()
+
+    def dumps(obj: Any) -> str:  # noqa: ANN401
+        return encoder.encode(obj).decode()
+
+    return decoder.decode, dumps
+
+
+def default_codec() -> tuple[JsonLoads, JsonDumps]:
+    """Return the fastest installed codec: orjson, msgspec or the stdlib one."""
+    for codec in (orjson_codec, msgspec_codec):
+        try:
+            return codec()
+        except ImportError:
+            continue
+    return stdlib_codec()
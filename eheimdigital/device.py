@@ -3,27 +3,308 @@
 from __future__ import annotations
 
 from abc import abstractmethod
-from functools import cached_property
-from typing import TYPE_CHECKING, Any
+import asyncio
+from collections.abc import Callable, Coroutine
+from functools import cached_property, wraps
+from logging import getLogger
+from time import monotonic
+from typing import TYPE_CHECKING, Any, ClassVar, NamedTuple
 
-from .types import EheimDeviceType
+from .types import (
+    EheimDeviceType,
+    EheimDigitalClientError,
+    FieldChange,
+    MsgTitle,
+    RollbackEvent,
+)
 
 if TYPE_CHECKING:
-    from .hub import EheimDigitalHub
+    from collections.abc import Mapping
+
+    from .hub import EheimDigitalHub, PacketCallback
     from .types import UsrDtaPacket
 
+_LOGGER = getLogger(__package__)
+
+type PacketHandler = Callable[[Any, dict[str, Any]], dict[str, FieldChange]]
+type PacketWriter[D] = Callable[[D, dict[str, Any]], Coroutine[Any, Any, None]]
+
+
+class PendingWrite(NamedTuple):
+    """Represent the merged data of coalesced writes waiting to be sent."""
+
+    data: dict[str, Any]
+    future: asyncio.Future[None]
+    task: asyncio.Task[None]
+
+
+class OptimisticWrite(NamedTuple):
+    """Represent field values shown before the device confirmed them."""
+
+    confirmed: Mapping[str, Any]
+    expected: dict[str, Any]
+    timeout: asyncio.Task[None]
+
+
+def packet_handler[F: PacketHandler](
+    *titles: str, request: MsgTitle | None = None
+) -> Callable[[F], F]:
+    """Register a device method as the parser of packets with the given titles.
+
+    request is the title of the packet that asks the device for them.
+    """
+
+    def decorator(func: F) -> F:
+        func.packet_titles = titles  # type: ignore[attr-defined]
+        func.packet_request = request  # type: ignore[attr-defined]
+        return func
+
+    return decorator
+
+
+def coalesced_write[D: EheimDigitalDevice](func: PacketWriter[D]) -> PacketWriter[D]:
+    """Merge the data of calls to a packet writer within the hub's write window.
+
+    If the hub has a write_coalesce_window, the data of all calls made within it
+    is merged, later values winning, and sent as one packet. Every caller waits
+    until that packet is sent, a failure is raised to the callers still waiting.
+    """
+
+    @wraps(func)
+    async def wrapper(self: D, data: dict[str, Any]) -> None:
+        if self.hub.write_coalesce_window is None:
+            await func(self, data)
+            return
+        if (pending := self.pending_writes.get(func.__name__)) is None:
+            pending = self.pending_writes[func.__name__] = PendingWrite(
+                {},
+                self.hub.loop.create_future(),
+                self.hub.loop.create_task(flush(self)),
+            )
+        pending.data.update(data)
+        await asyncio.shield(pending.future)
+
+    async def flush(self: D) -> None:
+        await asyncio.sleep(self.hub.write_coalesce_window or 0)
+        pending = self.pending_writes.pop(func.__name__)
+        try:
+            await func(self, pending.data)
+        except Exception as err:  # noqa: BLE001
+            _LOGGER.debug(
+                "Coalesced %s of %s failed: %s", func.__name__, self.mac_address, err
+            )
+            pending.future.set_exception(err)
+            _ = pending.future.exception()
+        else:
+            pending.future.set_result(None)
+
+    return wrapper
+
+
+def optimistic_write[D: EheimDigitalDevice](
+    attr: str,
+    fields: Mapping[str, str] | None = None,
+    values: Mapping[str, Any] | None = None,
+) -> Callable[[PacketWriter[D]], PacketWriter[D]]:
+    """Show the data of a packet writer in the packet in attr right away.
+
+    Only if the hub is optimistic. fields maps the names in the written data to
+    the names in the packet where they differ, values are set by every write.
+    The values are rolled back if sending fails, if the next packet disagrees or
+    if none arrives in time.
+    """
+    names = fields or {}
+    constants = values or {}
+
+    def decorator(func: PacketWriter[D]) -> PacketWriter[D]:
+        @wraps(func)
+        async def wrapper(self: D, data: dict[str, Any]) -> None:
+            if self.hub.optimistic:
+                self.apply_optimistic(
+                    attr,
+                    {
+                        **{names.get(key, key): value for key, value in data.items()},
+                        **constants,
+                    },
+                )
+            try:
+                await func(self, data)
+            except EheimDigitalClientError:
+                await self.rollback(attr)
+                raise
+
+        return wrapper
+
+    return decorator
+
 
 class EheimDigitalDevice:
     """Represent a Eheim Digital device."""
 
     hub: EheimDigitalHub
+    optimistic_masks: ClassVar[dict[str, int]] = {}
+    optimistic_writes: dict[str, OptimisticWrite]
+    packet_attrs: set[str]
+    packet_handlers: ClassVar[dict[str, PacketHandler]] = {}
+    pending_writes: dict[str, PendingWrite]
+    received_at: dict[str, float]
+    refresh_requests: ClassVar[dict[str, MsgTitle]] = {
+        MsgTitle.USRDTA: MsgTitle.GET_USRDTA
+    }
     usrdta: UsrDtaPacket
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:  # noqa: ANN401
+        """Collect the packet handlers and refresh requests of a device class."""
+        super().__init_subclass__(**kwargs)
+        handlers = [
+            func for func in vars(cls).values() if hasattr(func, "packet_titles")
+        ]
+        cls.packet_handlers = {
+            **cls.packet_handlers,
+            **{title: func for func in handlers for title in func.packet_titles},
+        }
+        cls.refresh_requests = {
+            **cls.refresh_requests,
+            **{
+                title: func.packet_request
+                for func in handlers
+                if func.packet_request is not None
+                for title in func.packet_titles
+            },
+        }
+
     def __init__(self, hub: EheimDigitalHub, usrdta: UsrDtaPacket) -> None:
         """Initialize a device."""
         self.hub = hub
+        self.optimistic_writes = {}
+        self.packet_attrs = set()
+        self.pending_writes = {}
+        self.received_at = {}
         self.usrdta = usrdta
 
+    def update_packet(
+        self, attr: str, packet: Mapping[str, Any]
+    ) -> dict[str, FieldChange]:
+        """Store a received packet in attr and return the fields that changed.
+
+        An identical packet is not stored again and returns no changes.
+        Optimistic values in attr are confirmed or rolled back by the packet.
+        """
+        self.packet_attrs.add(attr)
+        if (optimistic := self.optimistic_writes.pop(attr, None)) is not None:
+            _ = optimistic.timeout.cancel()
+            if rejected := {
+                key: FieldChange(value, packet.get(key))
+                for key, value in optimistic.expected.items()
+                if self.masked(key, packet.get(key)) != self.masked(key, value)
+            }:
+                self.hub.schedule_rollback(
+                    RollbackEvent(self.mac_address, attr, rejected)
+                )
+        old: Mapping[str, Any] | None = getattr(self, attr)
+        if old is None:
+            changes = {key: FieldChange(None, value) for key, value in packet.items()}
+        else:
+            changes = {
+                key: FieldChange(old.get(key), value)
+                for key, value in packet.items()
+                if key not in old or old[key] != value
+            }
+            changes.update(
+                (key, FieldChange(value, None))
+                for key, value in old.items()
+                if key not in packet
+            )
+        if changes:
+            setattr(self, attr, packet)
+        return changes
+
+    def stored_packets(self) -> dict[str, Mapping[str, Any]]:
+        """Return the received packets per attribute, without optimistic values."""
+        return {
+            attr: optimistic.confirmed
+            if (optimistic := self.optimistic_writes.get(attr)) is not None
+            else getattr(self, attr)
+            for attr in self.packet_attrs
+        }
+
+    def update_usrdta(self, usrdta: UsrDtaPacket) -> dict[str, FieldChange]:
+        """Store a received USRDTA packet and return the fields that changed."""
+        self.received_at[str(MsgTitle.USRDTA)] = monotonic()
+        changes = self.update_packet("usrdta", usrdta)
+        if changes:
+            for cls in type(self).__mro__:
+                for name, value in vars(cls).items():
+                    if isinstance(value, cached_property):
+                        _ = self.__dict__.pop(name, None)
+        return changes
+
+    def apply_optimistic(self, attr: str, fields: Mapping[str, Any]) -> None:
+        """Show fields in the packet in attr until the device confirms them."""
+        if not fields or (packet := getattr(self, attr)) is None:
+            return
+        if (optimistic := self.optimistic_writes.get(attr)) is not None:
+            _ = optimistic.timeout.cancel()
+            confirmed, expected = optimistic.confirmed, optimistic.expected
+        else:
+            confirmed, expected = packet, {}
+        expected.update(fields)
+        self.optimistic_writes[attr] = OptimisticWrite(
+            confirmed, expected, self.hub.loop.create_task(self.expire_optimistic(attr))
+        )
+        setattr(
+            self,
+            attr,
+            {
+                **packet,
+                **{
+                    key: self.overlay(key, packet.get(key), value)
+                    for key, value in fields.items()
+                },
+            },
+        )
+
+    def masked(self, key: str, value: Any) -> Any:  # noqa: ANN401
+        """Return the bits of a field that optimistic writes set, see optimistic_masks."""
+        if (mask := self.optimistic_masks.get(key)) is None or not isinstance(
+            value, int
+        ):
+            return value
+        return value & mask
+
+    def overlay(self, key: str, old: Any, new: Any) -> Any:  # noqa: ANN401
+        """Return an optimistic field value, keeping the bits outside the mask."""
+        if (mask := self.optimistic_masks.get(key)) is None or not isinstance(old, int):
+            return new
+        return (old & ~mask) | (new & mask)
+
+    async def expire_optimistic(self, attr: str) -> None:
+        """Roll back the optimistic values in attr if the device did not confirm them."""
+        await asyncio.sleep(self.hub.optimistic_timeout)
+        await self.rollback(attr, expired=True)
+
+    async def rollback(self, attr: str, *, expired: bool = False) -> None:
+        """Restore the last packet in attr the device sent and drop optimistic values."""
+        if (optimistic := self.optimistic_writes.pop(attr, None)) is None:
+            return
+        if not expired:
+            _ = optimistic.timeout.cancel()
+        setattr(self, attr, optimistic.confirmed)
+        if not optimistic.expected:
+            return
+        await self.hub.notify_rollback(
+            RollbackEvent(
+                self.mac_address,
+                attr,
+                {
+                    key: FieldChange(value, optimistic.confirmed.get(key))
+                    for key, value in optimistic.expected.items()
+                },
+            )
+        )
+        await self.hub.notify_receive(self.mac_address)
+
+    @coalesced_write
     async def set_usrdta(self, data: dict[str, Any]) -> None:
         """Send a USRDTA packet, containing new values from data."""
         await self.hub.send_packet({**self.usrdta, **data})
@@ -73,13 +354,61 @@ class EheimDigitalDevice:
         """Set a new Sys LED brightness."""
         await self.set_usrdta({"sysLED": value})
 
-    @abstractmethod
-    async def parse_message(self, msg: dict[str, Any]) -> None:
-        """Parse a message."""
+    def subscribe(
+        self, callback: PacketCallback, *, title: str | None = None
+    ) -> Callable[[], None]:
+        """Subscribe to the packets of this device, optionally only to one title.
+
+        Returns a function to unsubscribe again.
+        """
+        return self.hub.subscribe(callback, mac_address=self.mac_address, title=title)
+
+    async def parse_message(self, msg: dict[str, Any]) -> dict[str, FieldChange] | None:
+        """Parse a message and return the changed fields, or None if not handled."""
+        if (handler := self.packet_handlers.get(msg["title"])) is None:
+            return None
+        self.received_at[str(msg["title"])] = monotonic()
+        return handler(self, msg)
+
+    @property
+    def has_data(self) -> bool:
+        """Return whether a data packet has been received."""
+        return not self.packet_handlers or any(
+            title in self.packet_handlers for title in self.received_at
+        )
+
+    def age(self, title: str) -> float | None:
+        """Return the seconds since a packet was received, None if it never was."""
+        if (received_at := self.received_at.get(title)) is None:
+            return None
+        return monotonic() - received_at
+
+    def is_stale(self, title: str, ttl: float) -> bool:
+        """Return whether a packet is older than ttl seconds or was never received."""
+        age = self.age(title)
+        return age is None or age > ttl
+
+    async def refresh(self, *titles: MsgTitle, wait: bool = False) -> None:
+        """Request packets again, by the titles of the packets."""
+        _ = await asyncio.gather(
+            *(
+                self.request_data(self.refresh_requests[title], title, wait=wait)
+                for title in titles
+            )
+        )
+
+    async def request_data(
+        self, title: MsgTitle, expect: MsgTitle, *, wait: bool = False
+    ) -> None:
+        """Request a data packet, with wait until the device has answered."""
+        if wait:
+            _ = await self.hub.request(self.mac_address, title, expect=expect)
+            return
+        await self.hub.poll(self.mac_address, title, expect=expect)
 
     @abstractmethod
-    async def update(self) -> None:
-        """Update a device state."""
+    async def update(self, *, wait: bool = False) -> None:
+        """Update a device state, with wait until fresh data has arrived."""
 
     def as_dict(self) -> dict[str, Any]:
         """Return the device as a dictionary."""
@@ -5,10 +5,17 @@ from __future__ import annotations
 from datetime import time, timedelta, timezone
 from functools import cached_property
 from logging import getLogger
-from typing import TYPE_CHECKING, Any, override
+from typing import TYPE_CHECKING, Any, ClassVar, override
 
-from .device import EheimDigitalDevice
+from .device import (
+    EheimDigitalDevice,
+    coalesced_write,
+    optimistic_write,
+    packet_handler,
+)
+from .registry import register_device
 from .types import (
+    EheimDeviceType,
     FilterDataPacket,
     FilterModeProf,
     MsgTitle,
@@ -18,33 +25,49 @@ from .types import (
 
 if TYPE_CHECKING:
     from eheimdigital.hub import EheimDigitalHub
+    from eheimdigital.types import FieldChange
 
 _LOGGER = getLogger(__package__)
 
+PULSE_MODE_FIELDS = {
+    "time_high": "pm_time_high",
+    "time_low": "pm_time_low",
+    "dfs_soll_high": "pm_dfs_soll_high",
+    "dfs_soll_low": "pm_dfs_soll_low",
+}
+NOCTURNAL_MODE_FIELDS = {
+    "dfs_soll_day": "nm_dfs_soll_day",
+    "dfs_soll_night": "nm_dfs_soll_night",
+}
+
 
+@register_device(EheimDeviceType.VERSION_EHEIM_EXT_FILTER)
 class EheimDigitalFilter(EheimDigitalDevice):
     """Represent a Eheim Digital professionel 5e filter."""
 
     filter_data: FilterDataPacket | None = None
+    optimistic_masks: ClassVar[dict[str, int]] = {"pumpMode": 255}
 
     def __init__(self, hub: EheimDigitalHub, usrdta: UsrDtaPacket) -> None:
         """Initialize a professionel 5e filter."""
         super().__init__(hub, usrdta)
 
-    @override
-    async def parse_message(self, msg: dict[str, Any]) -> None:
-        """Parse a message."""
-        if msg["title"] == MsgTitle.FILTER_DATA:
-            self.filter_data = FilterDataPacket(**msg)
+    @packet_handler(MsgTitle.FILTER_DATA, request=MsgTitle.GET_FILTER_DATA)
+    def parse_filter_data(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+        """Parse a FILTER_DATA packet."""
+        return self.update_packet("filter_data", FilterDataPacket(**msg))
 
     @override
-    async def update(self) -> None:
-        await self.hub.send_packet({
-            "title": MsgTitle.GET_FILTER_DATA,
-            "to": self.mac_address,
-            "from": "USER",
-        })
+    async def update(self, *, wait: bool = False) -> None:
+        """Get the new filter state."""
+        await self.request_data(
+            MsgTitle.GET_FILTER_DATA, MsgTitle.FILTER_DATA, wait=wait
+        )
 
+    @optimistic_write(
+        "filter_data", {"frequency": "freqSoll"}, {"pumpMode": FilterModeProf.MANUAL}
+    )
+    @coalesced_write
     async def start_filter_normal_mode_without_comp(self, data: dict[str, Any]) -> None:
         """Start the filter in manual mode."""
         if self.filter_data is None:
@@ -60,6 +83,12 @@ class EheimDigitalFilter(EheimDigitalDevice):
             **data,
         })
 
+    @optimistic_write(
+        "filter_data",
+        {"flow_rate": "sollStep"},
+        {"pumpMode": FilterModeProf.CONSTANT_FLOW},
+    )
+    @coalesced_write
     async def start_filter_normal_mode_with_comp(self, data: dict[str, Any]) -> None:
         """Start the filter in constant flow mode."""
         if self.filter_data is None:
@@ -75,6 +104,10 @@ class EheimDigitalFilter(EheimDigitalDevice):
             **data,
         })
 
+    @optimistic_write(
+        "filter_data", PULSE_MODE_FIELDS, {"pumpMode": FilterModeProf.PULSE}
+    )
+    @coalesced_write
     async def start_filter_pulse_mode(self, data: dict[str, Any]) -> None:
         """Start the filter in pulse mode."""
         if self.filter_data is None:
@@ -93,6 +126,10 @@ class EheimDigitalFilter(EheimDigitalDevice):
             **data,
         })
 
+    @optimistic_write(
+        "filter_data", NOCTURNAL_MODE_FIELDS, {"pumpMode": FilterModeProf.BIO}
+    )
+    @coalesced_write
     async def start_nocturnal_mode(self, data: dict[str, Any]) -> None:
         """Start the filter in Bio mode."""
         if self.filter_data is None:
@@ -111,6 +148,8 @@ class EheimDigitalFilter(EheimDigitalDevice):
             **data,
         })
 
+    @optimistic_write("filter_data", {"active": "filterActive"})
+    @coalesced_write
     async def set_filter_pump(self, data: dict[str, Any]) -> None:
         """Set the filter pump."""
         if self.filter_data is None:
@@ -202,8 +241,7 @@ class EheimDigitalFilter(EheimDigitalDevice):
     async def set_day_speed(self, speed: int) -> None:
         """Set the day filter speed in Bio mode."""
         if self.filter_data is not None:
-            self.filter_data["nm_dfs_soll_day"] = speed
-            await self.set_filter_mode(FilterModeProf.BIO)
+            await self.start_nocturnal_mode({"dfs_soll_day": speed})
 
     @property
     def night_speed(self) -> int | None:
@@ -215,8 +253,7 @@ class EheimDigitalFilter(EheimDigitalDevice):
     async def set_night_speed(self, speed: int) -> None:
         """Set the night filter speed in Bio mode."""
         if self.filter_data is not None:
-            self.filter_data["nm_dfs_soll_night"] = speed
-            await self.set_filter_mode(FilterModeProf.BIO)
+            await self.start_nocturnal_mode({"dfs_soll_night": speed})
 
     @property
     def day_start_time(self) -> time | None:
@@ -232,8 +269,9 @@ class EheimDigitalFilter(EheimDigitalDevice):
     async def set_day_start_time(self, time: time) -> None:
         """Set the day start time for Bio mode."""
         if self.filter_data is not None:
-            self.filter_data["end_time_night_mode"] = time.hour * 60 + time.minute
-            await self.set_filter_mode(FilterModeProf.BIO)
+            await self.start_nocturnal_mode({
+                "end_time_night_mode": time.hour * 60 + time.minute
+            })
 
     @property
     def night_start_time(self) -> time | None:
@@ -249,8 +287,9 @@ class EheimDigitalFilter(EheimDigitalDevice):
     async def set_night_start_time(self, time: time) -> None:
         """Set the day start time for Bio mode."""
         if self.filter_data is not None:
-            self.filter_data["start_time_night_mode"] = time.hour * 60 + time.minute
-            await self.set_filter_mode(FilterModeProf.BIO)
+            await self.start_nocturnal_mode({
+                "start_time_night_mode": time.hour * 60 + time.minute
+            })
 
     @property
     def high_pulse_speed(self) -> int | None:
@@ -262,8 +301,7 @@ class EheimDigitalFilter(EheimDigitalDevice):
     async def set_high_pulse_speed(self, speed: int) -> None:
         """Set pulse speed for high in Pulse mode."""
         if self.filter_data is not None:
-            self.filter_data["pm_dfs_soll_high"] = speed
-            await self.set_filter_mode(FilterModeProf.PULSE)
+            await self.start_filter_pulse_mode({"dfs_soll_high": speed})
 
     @property
     def low_pulse_speed(self) -> int | None:
@@ -275,8 +313,7 @@ class EheimDigitalFilter(EheimDigitalDevice):
     async def set_low_pulse_speed(self, speed: int) -> None:
         """Set pulse speed for low in Pulse mode."""
         if self.filter_data is not None:
-            self.filter_data["pm_dfs_soll_low"] = speed
-            await self.set_filter_mode(FilterModeProf.PULSE)
+            await self.start_filter_pulse_mode({"dfs_soll_low": speed})
 
     @property
     def pulse_speeds(self) -> tuple[int, int] | None:
@@ -298,8 +335,7 @@ class EheimDigitalFilter(EheimDigitalDevice):
     async def set_high_pulse_time(self, time: int) -> None:
         """Set pulse time for high in Pulse mode."""
         if self.filter_data is not None:
-            self.filter_data["pm_time_high"] = time
-            await self.set_filter_mode(FilterModeProf.PULSE)
+            await self.start_filter_pulse_mode({"time_high": time})
 
     @property
     def low_pulse_time(self) -> int | None:
@@ -311,8 +347,7 @@ class EheimDigitalFilter(EheimDigitalDevice):
     async def set_low_pulse_time(self, time: int) -> None:
         """Set pulse time for low in Pulse mode."""
         if self.filter_data is not None:
-            self.filter_data["pm_time_low"] = time
-            await self.set_filter_mode(FilterModeProf.PULSE)
+            await self.start_filter_pulse_mode({"time_low": time})
 
     @property
     def pulse_times(self) -> tuple[int, int] | None:
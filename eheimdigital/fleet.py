@@ -0,0 +1,121 @@
+"""Management of several Eheim Digital hubs."""
+
+from __future__ import annotations
+
+import asyncio
+from logging import getLogger
+from typing import TYPE_CHECKING, Any
+
+from .hub import EheimDigitalHub
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    import aiohttp
+
+    from .device import EheimDigitalDevice
+    from .types import UpdateResult
+
+_LOGGER = getLogger(__package__)
+
+DEFAULT_DNS_CACHE_TTL = 300
+DEFAULT_STAGGER = 0.2
+
+
+class EheimDigitalFleet:
+    """Represent a fleet of Eheim Digital hubs sharing one client session."""
+
+    hubs: dict[str, EheimDigitalHub]
+    loop: asyncio.AbstractEventLoop
+    session: aiohttp.ClientSession
+    stagger: float
+
+    def __init__(
+        self,
+        *,
+        session: aiohttp.ClientSession | None = None,
+        loop: asyncio.AbstractEventLoop | None = None,
+        stagger: float = DEFAULT_STAGGER,
+    ) -> None:
+        """Initialize a fleet.
+
+        Connects and updates of the hubs are spread out by stagger seconds per
+        hub, so the hubs are not all polled at the same moment.
+        """
+        if session is None:
+            import aiohttp  # noqa: PLC0415
+
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=0, ttl_dns_cache=DEFAULT_DNS_CACHE_TTL
+                )
+            )
+            self._owns_session = True
+        else:
+            self._owns_session = False
+        self.hubs = {}
+        self.loop = loop or asyncio.get_event_loop()
+        self.session = session
+        self.stagger = stagger
+
+    def add_hub(self, host: str, **kwargs: Any) -> EheimDigitalHub:  # noqa: ANN401
+        """Add a hub to the fleet. The keyword arguments are passed to the hub."""
+        if host in self.hubs:
+            return self.hubs[host]
+        hub = self.hubs[host] = EheimDigitalHub(
+            host=host, session=self.session, loop=self.loop, **kwargs
+        )
+        return hub
+
+    async def remove_hub(self, host: str) -> None:
+        """Close a hub and remove it from the fleet."""
+        if (hub := self.hubs.pop(host, None)) is not None:
+            await hub.close()
+
+    async def _staggered[T](
+        self, action: str, call: Callable[[EheimDigitalHub], Awaitable[T]]
+    ) -> dict[str, T | BaseException]:
+        """Run call for every hub, starting each one stagger seconds later."""
+
+        async def run(index: int, hub: EheimDigitalHub) -> T:
+            await asyncio.sleep(index * self.stagger)
+            return await call(hub)
+
+        hosts = list(self.hubs)
+        results = await asyncio.gather(
+            *(run(index, self.hubs[host]) for index, host in enumerate(hosts)),
+            return_exceptions=True,
+        )
+        for host, result in zip(hosts, results, strict=True):
+            if isinstance(result, Exception):
+                _LOGGER.warning("%s of hub %s failed: %s", action, host, result)
+        return dict(zip(hosts, results, strict=True))
+
+    async def connect(self) -> dict[str, BaseException | None]:
+        """Connect all hubs and return the errors per host."""
+        return await self._staggered("Connecting", EheimDigitalHub.connect)
+
+    async def update(self) -> dict[str, UpdateResult | BaseException]:
+        """Update all hubs and return the results per host."""
+        return await self._staggered("Updating", EheimDigitalHub.update)
+
+    async def close(self) -> None:
+        """Close all hubs, and the client session if it is owned by the fleet."""
+        _ = await asyncio.gather(
+            *(hub.close() for hub in self.hubs.values()), return_exceptions=True
+        )
+        if self._owns_session:
+            await self.session.close()
+
+    @property
+    def devices(self) -> dict[tuple[str, str], EheimDigitalDevice]:
+        """Return the devices of all hubs, keyed by hub host and MAC address."""
+        return {
+            (host, mac_address): device
+            for host, hub in self.hubs.items()
+            for mac_address, device in hub.devices.items()
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the fleet as a dictionary."""
+        return {host: hub.as_dict() for host, hub in self.hubs.items()}
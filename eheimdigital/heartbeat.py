@@ -0,0 +1,65 @@
+"""Round-trip latency tracking for the Eheim Digital hub heartbeat."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from math import ceil
+
+DEFAULT_HEARTBEAT_MISSES = 3
+DEFAULT_HEARTBEAT_TIMEOUT = 5.0
+DEFAULT_LATENCY_WINDOW = 100
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+@dataclass(frozen=True, slots=True)
+class HeartbeatOptions:
+    """Ask the main device for its USRDTA every interval seconds while connected.
+
+    The connection is restored after misses heartbeats in a row went unanswered
+    for timeout seconds.
+    """
+
+    interval: float
+    timeout: float = DEFAULT_HEARTBEAT_TIMEOUT
+    misses: int = DEFAULT_HEARTBEAT_MISSES
+
+
+class LatencyTracker:
+    """Keep the last window round-trip latencies and their percentiles."""
+
+    misses: int
+    samples: deque[float]
+
+    def __init__(self, window: int = DEFAULT_LATENCY_WINDOW) -> None:
+        """Initialize a latency tracker."""
+        self.misses = 0
+        self.samples = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        """Record an answered heartbeat."""
+        self.misses = 0
+        self.samples.append(latency)
+
+    def miss(self) -> int:
+        """Record an unanswered heartbeat and return the misses in a row."""
+        self.misses += 1
+        return self.misses
+
+    def percentile(self, percent: float) -> float | None:
+        """Return a latency percentile in seconds, None without samples."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[max(ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+    def percentiles(
+        self, percents: tuple[float, ...] = DEFAULT_PERCENTILES
+    ) -> dict[float, float | None]:
+        """Return several latency percentiles in seconds."""
+        return {percent: self.percentile(percent) for percent in percents}
+
+    @property
+    def last(self) -> float | None:
+        """Return the latest latency in seconds."""
+        return self.samples[-1] if self.samples else None
@@ -5,14 +5,21 @@ from __future__ import annotations
 from datetime import datetime, time, timedelta, timezone
 from typing import TYPE_CHECKING, Any, override
 
-from .device import EheimDigitalDevice
-from .types import HeaterDataPacket, HeaterMode, HeaterUnit, MsgTitle
+from .device import (
+    EheimDigitalDevice,
+    coalesced_write,
+    optimistic_write,
+    packet_handler,
+)
+from .registry import register_device
+from .types import EheimDeviceType, HeaterDataPacket, HeaterMode, HeaterUnit, MsgTitle
 
 if TYPE_CHECKING:
     from .hub import EheimDigitalHub
-    from .types import UsrDtaPacket
+    from .types import FieldChange, UsrDtaPacket
 
 
+@register_device(EheimDeviceType.VERSION_EHEIM_EXT_HEATER)
 class EheimDigitalHeater(EheimDigitalDevice):
     """Represent a Eheim Digital Heater."""
 
@@ -22,21 +29,20 @@ class EheimDigitalHeater(EheimDigitalDevice):
         """Initialize a heater."""
         super().__init__(hub, usrdta)
 
-    @override
-    async def parse_message(self, msg: dict) -> None:
-        """Parse a message."""
-        if msg["title"] == MsgTitle.HEATER_DATA:
-            self.heater_data = HeaterDataPacket(**msg)
+    @packet_handler(MsgTitle.HEATER_DATA, request=MsgTitle.GET_EHEATER_DATA)
+    def parse_heater_data(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+        """Parse a HEATER_DATA packet."""
+        return self.update_packet("heater_data", HeaterDataPacket(**msg))
 
     @override
-    async def update(self) -> None:
+    async def update(self, *, wait: bool = False) -> None:
         """Get the new heater state."""
-        await self.hub.send_packet({
-            "title": MsgTitle.GET_EHEATER_DATA,
-            "to": self.mac_address,
-            "from": "USER",
-        })
+        await self.request_data(
+            MsgTitle.GET_EHEATER_DATA, MsgTitle.HEATER_DATA, wait=wait
+        )
 
+    @optimistic_write("heater_data")
+    @coalesced_write
     async def set_eheater_param(self, data: dict[str, Any]) -> None:
         """Send a SET_EHEATER_PARAM packet, containing new values from data."""
         if self.heater_data is None:
@@ -3,47 +3,145 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cached_property, partial
 from logging import getLogger
-from typing import TYPE_CHECKING, Any, Callable
+import random
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, NamedTuple
 
-import aiohttp
-from yarl import URL
-
-from .autofeeder import EheimDigitalAutofeeder
-from .classic_led_ctrl import EheimDigitalClassicLEDControl
-from .classic_vario import EheimDigitalClassicVario
-from .filter import EheimDigitalFilter
-from .heater import EheimDigitalHeater
-from .ph_control import EheimDigitalPHControl
+from .capture import CaptureRecorder, replay_capture
+from .codec import default_codec
+from .device import EheimDigitalDevice
+from .heartbeat import HeartbeatOptions, LatencyTracker
+from .metrics import (
+    DEFAULT_METRICS_PORT,
+    HubMetrics,
+    MetricsRegistry,
+    register_hub_gauges,
+    serve_metrics,
+)
+from .polling import PushTracker
+from .ratelimit import RateLimiter
+from .registry import get_device_class
+from .snapshot import create_snapshot, read_snapshot, restore_snapshot, write_snapshot
 from .types import (
+    ConnectionState,
     EheimDeviceType,
     EheimDigitalClientError,
+    EheimDigitalTimeoutError,
+    FieldChange,
+    FrameDirection,
     MeshNetworkPacket,
     MsgTitle,
+    PacketEvent,
+    QueueOverflowPolicy,
+    ReplayResult,
+    UpdateResult,
     UsrDtaPacket,
 )
 
 if TYPE_CHECKING:
-    from collections.abc import Awaitable
+    from collections.abc import Awaitable, Mapping
+    from os import PathLike
+
+    import aiohttp
+    from aiohttp import web
+    from yarl import URL
 
-    from .device import EheimDigitalDevice
+    from .codec import JsonDumps, JsonLoads
+    from .types import RollbackEvent
 
 
 _LOGGER = getLogger(__package__)
 
+type PacketCallback = Callable[[PacketEvent], Awaitable[None]]
+
+DEFAULT_BATCH_MAX_PACKETS = 20
+DEFAULT_BATCH_PROBE_ATTEMPTS = 3
+DEFAULT_BATCH_PROBE_TIMEOUT = 5.0
+DEFAULT_INBOUND_QUEUE_SIZE = 1000
+DEFAULT_OPTIMISTIC_TIMEOUT = 10.0
+DEFAULT_RECONNECT_MIN_DELAY = 1.0
+DEFAULT_RECONNECT_MAX_DELAY = 60.0
+DEFAULT_REQUEST_RETRIES = 2
+DEFAULT_REQUEST_TIMEOUT = 5.0
+DEFAULT_UPDATE_CONCURRENCY = 8
+
+
+@dataclass(frozen=True, slots=True)
+class BatchOptions:
+    """Send the packets queued within window seconds as one JSON array frame.
+
+    With a window of 0, the packets queued within one event loop iteration. A
+    frame holds at most max_packets packets. The first array frame only carries
+    requests and probes whether the hub supports array frames. If it is not
+    answered within probe_timeout seconds, its requests are sent again one per
+    frame, and if those are answered, one frame per packet is sent from then on.
+    So it is if the connection dropped after probe_attempts probes in a row.
+    """
+
+    window: float = 0.0
+    max_packets: int = DEFAULT_BATCH_MAX_PACKETS
+    probe_timeout: float = DEFAULT_BATCH_PROBE_TIMEOUT
+    probe_attempts: int = DEFAULT_BATCH_PROBE_ATTEMPTS
+
+
+class BatchProbe(NamedTuple):
+    """Represent the first array frame, sent to find out if the hub supports them."""
+
+    expected: frozenset[tuple[str, str]]
+    packets: list[dict[str, Any]]
+    resent: bool
+    timeout_task: asyncio.Task[None]
+
 
 class EheimDigitalHub:
     """Represent a Eheim Digital hub."""
 
+    batch_frames_supported: bool | None = None
+    batch_probe_drops: int = 0
+    batching: BatchOptions | None
+    callback_debounce: float
+    changes_callback: Callable[[frozenset[str]], Awaitable[None]] | None
+    coalesce_callbacks: bool
+    connection_state: ConnectionState = ConnectionState.DISCONNECTED
+    deduplicate_requests: bool
+    deduplicated_requests: int
+    connection_state_callback: Callable[[ConnectionState], Awaitable[None]] | None
     device_found_callback: Callable[[str, EheimDeviceType], Awaitable[None]] | None
     devices: dict[str, EheimDigitalDevice]
+    dispatch_task: asyncio.Task[None] | None = None
+    inbound: asyncio.Queue[list[dict[str, Any]] | dict[str, Any]]
+    inbound_dropped: int
+    heartbeat: HeartbeatOptions | None
+    heartbeat_task: asyncio.Task[None] | None = None
+    hub_metrics: HubMetrics | None
+    inbound_overflow: QueueOverflowPolicy
+    latency: LatencyTracker
+    json_dumps: JsonDumps
+    json_loads: JsonLoads
     loop: asyncio.AbstractEventLoop
     main: EheimDigitalDevice | None
     main_device_added_event: asyncio.Event | None = None
+    mesh_members: set[str]
+    metrics_registry: MetricsRegistry
+    metrics_runner: web.AppRunner | None = None
+    optimistic: bool
+    optimistic_timeout: float
+    push_tracker: PushTracker | None
+    rate_limiter: RateLimiter
     receive_callback: Callable[[], Awaitable[None]] | None
+    recorder: CaptureRecorder | None
+    ready_after: float | None = None
     receive_task: asyncio.Task[None] | None = None
-    session: aiohttp.ClientSession
-    url: URL
+    reconnect_max_delay: float
+    reconnect_min_delay: float
+    rollback_callback: Callable[[RollbackEvent], Awaitable[None]] | None
+    supervisor_task: asyncio.Task[None] | None = None
+    update_concurrency: int
+    write_coalesce_window: float | None
     ws: aiohttp.ClientWebSocketResponse | None = None
 
     def __init__(
@@ -56,117 +154,767 @@ class EheimDigitalHub:
         main_device_added_event: asyncio.Event | None = None,
         device_found_callback: Callable[[str, EheimDeviceType], Awaitable[None]]
         | None = None,
+        connection_state_callback: Callable[[ConnectionState], Awaitable[None]]
+        | None = None,
+        reconnect_min_delay: float = DEFAULT_RECONNECT_MIN_DELAY,
+        reconnect_max_delay: float = DEFAULT_RECONNECT_MAX_DELAY,
+        batching: BatchOptions | None = None,
+        update_concurrency: int = DEFAULT_UPDATE_CONCURRENCY,
+        adaptive_polling: bool = False,
+        json_loads: JsonLoads | None = None,
+        json_dumps: JsonDumps | None = None,
+        inbound_queue_size: int = DEFAULT_INBOUND_QUEUE_SIZE,
+        inbound_overflow: QueueOverflowPolicy = QueueOverflowPolicy.BLOCK,
+        changes_callback: Callable[[frozenset[str]], Awaitable[None]] | None = None,
+        coalesce_callbacks: bool = False,
+        callback_debounce: float = 0.0,
+        write_coalesce_window: float | None = None,
+        optimistic: bool = False,
+        optimistic_timeout: float = DEFAULT_OPTIMISTIC_TIMEOUT,
+        rollback_callback: Callable[[RollbackEvent], Awaitable[None]] | None = None,
+        rate_limiter: RateLimiter | None = None,
+        deduplicate_requests: bool = True,
+        heartbeat: HeartbeatOptions | None = None,
+        capture_path: str | PathLike[str] | None = None,
+        collect_metrics: bool = False,
     ) -> None:
-        """Initialize a hub."""
+        """Initialize a hub.
+
+        Args:
+            host: The address of the hub, which may include a port.
+            session: The client session, one is created on the first connection.
+            loop: The event loop, the current one by default.
+            receive_callback: Called when a packet changed a device.
+            main_device_added_event: Set when the main device was added.
+            device_found_callback: Called with each newly found device.
+            connection_state_callback: Called when the connection state changes.
+            reconnect_min_delay: The first delay before reconnecting, in seconds.
+            reconnect_max_delay: The longest delay before reconnecting, in seconds.
+            batching: Share JSON array frames between packets sent close together.
+            update_concurrency: The most devices refreshed at once by update.
+            adaptive_polling: Do not poll data packets the devices keep pushing.
+            json_loads: The JSON decoder, orjson, msgspec or json by default.
+            json_dumps: The JSON encoder, orjson, msgspec or json by default.
+            inbound_queue_size: The most received frames waiting to be parsed.
+            inbound_overflow: What happens when the inbound queue is full.
+            changes_callback: Called with the MAC addresses of changed devices.
+            coalesce_callbacks: Call the callbacks once per frame, not per packet.
+            callback_debounce: Seconds to collect packets for coalesced callbacks.
+            write_coalesce_window: Seconds in which setter calls are merged.
+            optimistic: Show written values in the device state right away.
+            optimistic_timeout: Roll back optimistic values not confirmed in time.
+            rollback_callback: Called with the optimistic values rolled back.
+            rate_limiter: Limits the packets sent and in flight per device.
+            deduplicate_requests: Join identical GET requests not answered yet.
+            heartbeat: Measure the latency and restore a dead connection.
+            capture_path: Append every sent and received frame to this capture.
+            collect_metrics: Count the traffic and callback times for metrics.
+
+        """
+        self._batch_probe: BatchProbe | None = None
+        self._changed: set[str] = set()
+        self._connect_started: float | None = None
+        self._outstanding: dict[tuple[str, str], float] = {}
+        self._not_ready: set[str] = set()
+        self._ready = asyncio.Event()
+        self._debounce_task: asyncio.Task[None] | None = None
+        self._subscriptions: dict[
+            tuple[str | None, str | None], list[PacketCallback]
+        ] = {}
+        self._flush_task: asyncio.Task[None] | None = None
+        self._session = session
+        self._outbox: list[tuple[dict[str, Any], asyncio.Future[None]]] = []
+        self._rollback_tasks: set[asyncio.Task[None]] = set()
+        self._pending_responses: dict[
+            tuple[str, str], list[asyncio.Future[dict[str, Any]]]
+        ] = {}
+        self.batching = batching
+        self.callback_debounce = callback_debounce
+        self.changes_callback = changes_callback
+        self.coalesce_callbacks = coalesce_callbacks
+        self.connection_state_callback = connection_state_callback
+        self.deduplicate_requests = deduplicate_requests
+        self.deduplicated_requests = 0
         self.device_found_callback = device_found_callback
+        self.heartbeat = heartbeat
         self.devices = {}
+        self.inbound = asyncio.Queue(inbound_queue_size)
+        self.inbound_dropped = 0
+        self.inbound_overflow = inbound_overflow
+        default_loads, default_dumps = default_codec()
+        self.json_dumps = json_dumps or default_dumps
+        self.json_loads = json_loads or default_loads
+        self.latency = LatencyTracker()
         self.loop = loop or asyncio.get_event_loop()
         self.main = None
         self.main_device_added_event = main_device_added_event
+        self.mesh_members = set()
+        self.metrics_registry = MetricsRegistry()
+        self.hub_metrics = (
+            HubMetrics(self.metrics_registry) if collect_metrics else None
+        )
+        register_hub_gauges(self.metrics_registry, self)
+        self.optimistic = optimistic
+        self.optimistic_timeout = optimistic_timeout
+        self.push_tracker = PushTracker() if adaptive_polling else None
+        self.rate_limiter = rate_limiter or RateLimiter()
         self.receive_callback = receive_callback
-        self.session = session or aiohttp.ClientSession()
-        self.url = URL.build(scheme="http", host=host, path="/ws")
+        self.recorder = (
+            CaptureRecorder(capture_path, host) if capture_path is not None else None
+        )
+        self.reconnect_max_delay = reconnect_max_delay
+        self.reconnect_min_delay = reconnect_min_delay
+        self.rollback_callback = rollback_callback
+        self.update_concurrency = update_concurrency
+        self.write_coalesce_window = write_coalesce_window
+        self.host = host
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the client session, creating it on first use."""
+        if self._session is None:
+            import aiohttp  # noqa: PLC0415
+
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    @cached_property
+    def url(self) -> URL:
+        """Return the websocket URL of the hub."""
+        from yarl import URL  # noqa: PLC0415
+
+        return URL.build(scheme="http", authority=self.host, path="/ws")
+
+    @classmethod
+    async def from_snapshot(
+        cls,
+        path: str | PathLike[str],
+        **kwargs: Any,  # noqa: ANN401
+    ) -> EheimDigitalHub:
+        """Create a hub with the devices and packets of a saved snapshot.
+
+        The keyword arguments are passed to the hub. Connect and call
+        refresh_stale or update to revalidate the restored state.
+        """
+        hub = cls(**kwargs)
+        snapshot = await hub.loop.run_in_executor(
+            None, read_snapshot, path, hub.json_loads
+        )
+        await restore_snapshot(hub, snapshot)
+        return hub
+
+    async def save_snapshot(self, path: str | PathLike[str]) -> None:
+        """Save the devices and their latest packets, gzipped if path ends with .gz."""
+        encoded = self.json_dumps(create_snapshot(self))
+        await self.loop.run_in_executor(None, write_snapshot, path, encoded)
 
-    async def connect(self) -> None:  # pragma: no cover
-        """Connect to the hub."""
+    async def replay(
+        self, path: str | PathLike[str], *, speed: float | None = 1.0
+    ) -> ReplayResult:
+        """Feed the received frames of a capture file to the hub, without a network.
+
+        The frames are replayed speed times faster than recorded, or as fast as
+        possible if speed is None.
+        """
+        return await replay_capture(self, path, speed)
+
+    async def connect(self) -> None:
+        """Connect to the hub and start supervising the connection."""
+        self.reset_ready()
+        await self.set_connection_state(ConnectionState.CONNECTING)
+        try:
+            await self.open_websocket()
+        except Exception:
+            await self.set_connection_state(ConnectionState.DISCONNECTED)
+            raise
+        if self.supervisor_task is None or self.supervisor_task.done():
+            self.supervisor_task = self.loop.create_task(self.supervise())
+        if self.heartbeat is not None and (
+            self.heartbeat_task is None or self.heartbeat_task.done()
+        ):
+            self.heartbeat_task = self.loop.create_task(
+                self.send_heartbeats(self.heartbeat)
+            )
+
+    async def open_websocket(self) -> None:
+        """Open the websocket connection and start receiving messages."""
         self.ws = await self.session.ws_connect(self.url)
+        if self.dispatch_task is None or self.dispatch_task.done():
+            self.dispatch_task = self.loop.create_task(self.dispatch_messages())
         self.receive_task = self.loop.create_task(self.receive_messages())
+        await self.set_connection_state(ConnectionState.CONNECTED)
 
-    async def close(self) -> None:  # pragma: no cover
+    async def close(self) -> None:
         """Close the connection."""
-        if self.receive_task is not None:
-            _ = self.receive_task.cancel()
+        self.cancel_tasks()
         if self.ws is not None and not self.ws.closed:
             _ = await self.ws.close()
+        if self.recorder is not None:
+            await self.loop.run_in_executor(None, self.recorder.close)
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+            self.metrics_runner = None
+        await self.set_connection_state(ConnectionState.DISCONNECTED)
 
-    async def add_device(self, usrdta: UsrDtaPacket) -> None:  # noqa: C901, PLR0912
-        """Add a device to the device list."""
-        match EheimDeviceType(usrdta["version"]):
-            case EheimDeviceType.VERSION_EHEIM_EXT_HEATER:
-                self.devices[usrdta["from"]] = EheimDigitalHeater(self, usrdta)
-                if self.device_found_callback:
-                    await self.device_found_callback(
-                        usrdta["from"], EheimDeviceType(usrdta["version"])
-                    )
-            case EheimDeviceType.VERSION_EHEIM_CLASSIC_VARIO:
-                self.devices[usrdta["from"]] = EheimDigitalClassicVario(self, usrdta)
-                if self.device_found_callback:
-                    await self.device_found_callback(
-                        usrdta["from"], EheimDeviceType(usrdta["version"])
-                    )
-            case EheimDeviceType.VERSION_EHEIM_EXT_FILTER:
-                self.devices[usrdta["from"]] = EheimDigitalFilter(self, usrdta)
-                if self.device_found_callback:
-                    await self.device_found_callback(
-                        usrdta["from"], EheimDeviceType(usrdta["version"])
-                    )
-            case EheimDeviceType.VERSION_EHEIM_CLASSIC_LED_CTRL_PLUS_E:
-                self.devices[usrdta["from"]] = EheimDigitalClassicLEDControl(
-                    self, usrdta
+    def cancel_tasks(self) -> None:
+        """Cancel the background tasks of the connection."""
+        for task in (
+            self.supervisor_task,
+            self.heartbeat_task,
+            self.receive_task,
+            self.dispatch_task,
+            self._debounce_task,
+            self._flush_task,
+        ):
+            if task is not None:
+                _ = task.cancel()
+        self.supervisor_task = self.heartbeat_task = self.dispatch_task = None
+        self._debounce_task = self._flush_task = None
+        for _, future in self._outbox:
+            if not future.done():
+                future.set_exception(EheimDigitalClientError("Connection closed"))
+        self._outbox = []
+        if self._batch_probe is not None:
+            _ = self._batch_probe.timeout_task.cancel()
+            self._batch_probe = None
+
+    async def set_connection_state(self, state: ConnectionState) -> None:
+        """Set the connection state and notify about the transition."""
+        if state == self.connection_state:
+            return
+        _LOGGER.debug(
+            "Connection state of %s changed: %s -> %s",
+            self.url,
+            self.connection_state,
+            state,
+        )
+        self.connection_state = state
+        if state != ConnectionState.CONNECTED:
+            self._outstanding.clear()
+        if self.connection_state_callback:
+            await self.run_callback(
+                "connection_state", self.connection_state_callback(state)
+            )
+
+    def reconnect_delay(self, attempt: int) -> float:
+        """Return the jittered exponential backoff delay for a reconnect attempt."""
+        delay = min(
+            self.reconnect_max_delay, self.reconnect_min_delay * 2 ** min(attempt, 32)
+        )
+        return delay / 2 + random.uniform(0, delay / 2)  # noqa: S311
+
+    async def supervise(self) -> None:
+        """Reconnect whenever the connection drops and resync the device states."""
+        import aiohttp  # noqa: PLC0415
+
+        while True:
+            if self.receive_task is not None:
+                _ = await asyncio.wait((self.receive_task,))
+            if self._batch_probe is not None:
+                self.drop_batch_probe()
+            if self.ws is not None and not self.ws.closed:
+                _ = await self.ws.close()
+            await self.set_connection_state(ConnectionState.RECONNECTING)
+            attempt = 0
+            while True:
+                delay = self.reconnect_delay(attempt)
+                _LOGGER.info(
+                    "WebSocket connection to %s lost, reconnecting in %.1f s...",
+                    self.url,
+                    delay,
                 )
-                if self.device_found_callback:
-                    await self.device_found_callback(
-                        usrdta["from"], EheimDeviceType(usrdta["version"])
-                    )
-            case EheimDeviceType.VERSION_EHEIM_PH_CONTROL:
-                self.devices[usrdta["from"]] = EheimDigitalPHControl(self, usrdta)
-                if self.device_found_callback:
-                    await self.device_found_callback(
-                        usrdta["from"], EheimDeviceType(usrdta["version"])
-                    )
-            case EheimDeviceType.VERSION_EHEIM_FEEDER:
-                self.devices[usrdta["from"]] = EheimDigitalAutofeeder(self, usrdta)
-                if self.device_found_callback:
-                    await self.device_found_callback(
-                        usrdta["from"], EheimDeviceType(usrdta["version"])
-                    )
-            case _:
-                _LOGGER.warning(
-                    "Found device %s with unsupported device type %s",
-                    usrdta["from"],
-                    EheimDeviceType(usrdta["version"]),
+                await asyncio.sleep(delay)
+                attempt += 1
+                self.reset_ready()
+                try:
+                    await self.open_websocket()
+                except (aiohttp.ClientError, TimeoutError) as err:
+                    _LOGGER.debug("Reconnect to %s failed: %s", self.url, err)
+                else:
+                    if self.hub_metrics is not None:
+                        self.hub_metrics.reconnects.inc()
+                    break
+            await self.resync()
+
+    async def send_heartbeats(self, options: HeartbeatOptions) -> None:
+        """Measure the round-trip latency and restore the connection if it is dead."""
+        while True:
+            await asyncio.sleep(options.interval)
+            if self.connection_state != ConnectionState.CONNECTED or self.main is None:
+                continue
+            start = self.loop.time()
+            try:
+                _ = await self.request(
+                    self.main.mac_address,
+                    MsgTitle.GET_USRDTA,
+                    expect=MsgTitle.USRDTA,
+                    timeout=options.timeout,
+                    retries=0,
                 )
-                self.devices[usrdta["from"]] = EheimDigitalDevice(self, usrdta)
-                if self.device_found_callback:
-                    await self.device_found_callback(
-                        usrdta["from"], EheimDeviceType(usrdta["version"])
+            except EheimDigitalClientError:
+                misses = self.latency.miss()
+                _LOGGER.debug("Heartbeat %d to %s missed", misses, self.url)
+                if misses >= options.misses and self.receive_task is not None:
+                    _LOGGER.warning(
+                        "%s missed %d heartbeats, reconnecting", self.url, misses
                     )
+                    self.latency.misses = 0
+                    _ = self.receive_task.cancel()
+            else:
+                self.latency.record(self.loop.time() - start)
+
+    async def resync(self) -> None:
+        """Request the state of all devices after (re)connecting."""
+        try:
+            await self.request_usrdta("ALL")
+            for device in self.devices.values():
+                await device.update()
+        except EheimDigitalClientError:
+            _LOGGER.warning("Resync with %s failed", self.url, exc_info=True)
+
+    async def add_device(self, usrdta: UsrDtaPacket) -> None:
+        """Add a device to the device list."""
+        device_type = EheimDeviceType(usrdta["version"])
+        device_class = get_device_class(device_type)
+        if device_class is EheimDigitalDevice:
+            _LOGGER.warning(
+                "Found device %s with unsupported device type %s",
+                usrdta["from"],
+                device_type,
+            )
+        self.devices[usrdta["from"]] = device_class(self, usrdta)
+        if self.device_found_callback:
+            await self.device_found_callback(usrdta["from"], device_type)
         if self.main is None and usrdta["from"] in self.devices:
             self.main = self.devices[usrdta["from"]]
             if self.main_device_added_event:
                 self.main_device_added_event.set()
 
     async def request_usrdta(self, mac_address: str) -> None:
-        """Request the USRDTA of a device."""
-        await self.send_packet({
-            "title": MsgTitle.GET_USRDTA,
-            "to": mac_address,
-            "from": "USER",
-        })
+        """Request the USRDTA of a device, unless it was just requested."""
+        if not self.claim_request(
+            mac_address, MsgTitle.USRDTA, DEFAULT_REQUEST_TIMEOUT
+        ):
+            return
+        await self.send_claimed(
+            self.send_packet,
+            {"title": MsgTitle.GET_USRDTA, "to": mac_address, "from": "USER"},
+            MsgTitle.USRDTA,
+        )
+
+    async def request(
+        self,
+        mac_address: str,
+        title: MsgTitle,
+        *,
+        expect: MsgTitle,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,  # noqa: ASYNC109
+        retries: int = DEFAULT_REQUEST_RETRIES,
+        data: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Send a request and return the expected response packet.
+
+        The response is matched on its sender and title. An unanswered request is
+        sent again up to retries times, then EheimDigitalTimeoutError is raised.
+        The request holds an in-flight slot of the device until it is answered.
+        """
+        future: asyncio.Future[dict[str, Any]] = self.loop.create_future()
+        waiters = self._pending_responses.setdefault((mac_address, expect), [])
+        waiters.append(future)
+        start = self.loop.time()
+        try:
+            async with self.rate_limiter.slot(mac_address):
+                response = await self.await_response(
+                    future,
+                    {"title": title, "to": mac_address, "from": "USER", **(data or {})},
+                    expect=expect,
+                    timeout=timeout,
+                    retries=retries,
+                    deduplicate=data is None,
+                )
+            if self.hub_metrics is not None:
+                self.hub_metrics.request_duration.observe(
+                    self.loop.time() - start, expect
+                )
+            return response
+        finally:
+            waiters.remove(future)
+            if not waiters:
+                del self._pending_responses[mac_address, expect]
+            _ = future.cancel()
+
+    async def await_response(
+        self,
+        future: asyncio.Future[dict[str, Any]],
+        packet: dict[str, Any],
+        *,
+        expect: MsgTitle,
+        timeout: float,  # noqa: ASYNC109
+        retries: int,
+        deduplicate: bool,
+    ) -> dict[str, Any]:
+        """Send a request packet until future is resolved or the retries run out.
+
+        With deduplicate, the packet is not sent while an identical request is
+        outstanding.
+
+        Raises:
+            EheimDigitalTimeoutError: When the device did not answer in time.
+
+        """
+        for attempt in range(retries + 1):
+            if self.push_tracker is not None:
+                self.push_tracker.solicited(packet["to"], expect)
+            if not deduplicate:
+                await self.transmit(packet)
+            elif self.claim_request(packet["to"], expect, timeout):
+                await self.send_claimed(self.transmit, packet, expect)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except TimeoutError:
+                _ = self._outstanding.pop((packet["to"], expect), None)
+                _LOGGER.debug(
+                    "No %s from %s after %s (attempt %d)",
+                    expect,
+                    packet["to"],
+                    packet["title"],
+                    attempt + 1,
+                )
+        msg = f"{packet['to']} did not answer {packet['title']} with {expect}"
+        raise EheimDigitalTimeoutError(msg)
+
+    async def poll(
+        self, mac_address: str, title: MsgTitle, *, expect: MsgTitle
+    ) -> None:
+        """Request a data packet, unless the device keeps pushing it anyway."""
+        if self.push_tracker is not None:
+            if not self.push_tracker.should_poll(mac_address, expect):
+                _LOGGER.debug(
+                    "Not polling %s from %s, it is pushed", expect, mac_address
+                )
+                return
+            self.push_tracker.solicited(mac_address, expect)
+        if self.claim_request(mac_address, expect, DEFAULT_REQUEST_TIMEOUT):
+            await self.send_claimed(
+                self.send_packet,
+                {"title": title, "to": mac_address, "from": "USER"},
+                expect,
+            )
+
+    def claim_request(self, mac_address: str, expect: str, ttl: float) -> bool:
+        """Claim sending a GET request for ttl seconds.
+
+        Returns False if an identical request is still outstanding, then the
+        caller joins it instead of sending again. Nothing is claimed while
+        disconnected, as the request is not sent.
+        """
+        if not self.deduplicate_requests or self.ws is None or self.ws.closed:
+            return True
+        key = (mac_address, expect)
+        now = self.loop.time()
+        if (expires := self._outstanding.get(key)) is not None and expires > now:
+            self.deduplicated_requests += 1
+            _LOGGER.debug("Joining outstanding request for %s from %s", *key[::-1])
+            return False
+        self._outstanding[key] = now + ttl
+        return True
+
+    async def send_claimed(
+        self,
+        send: Callable[[dict[str, Any]], Awaitable[None]],
+        packet: dict[str, Any],
+        expect: str,
+    ) -> None:
+        """Send a claimed request packet, releasing the claim if sending fails."""
+        try:
+            await send(packet)
+        except BaseException:
+            _ = self._outstanding.pop((packet["to"], expect), None)
+            raise
+
+    def resolve_pending(self, msg: dict[str, Any]) -> None:
+        """Resolve the requests waiting for a received packet."""
+        keys = ((msg["from"], msg["title"]), ("ALL", msg["title"]))
+        if self._outstanding:
+            for key in keys:
+                _ = self._outstanding.pop(key, None)
+        if not self._pending_responses:
+            return
+        for key in keys:
+            for future in self._pending_responses.get(key, ()):
+                if not future.done():
+                    future.set_result(msg)
 
     async def send_packet(self, packet: dict[str, Any]) -> None:
         """Send a packet to the hub.
 
+        Connection errors are raised as EheimDigitalClientError, also when the
+        packet was sent as part of a batch.
+        """
+        async with self.rate_limiter.slot(packet.get("to")):
+            await self.transmit(packet)
+
+    async def transmit(self, packet: dict[str, Any]) -> None:
+        """Send a packet once the rate limit allows it, in a batch if enabled."""
+        if self.ws is None:
+            return
+        await self.rate_limiter.acquire()
+        if self.batching is None or self.batch_frames_supported is False:
+            await self.send_frame(packet)
+            return
+        future: asyncio.Future[None] = self.loop.create_future()
+        self._outbox.append((packet, future))
+        if self._flush_task is None:
+            self._flush_task = self.loop.create_task(self.flush_outbox(self.batching))
+        await future
+
+    async def send_frame(self, frame: dict[str, Any] | list[dict[str, Any]]) -> None:
+        """Send a single frame containing one or more packets.
+
         Raises:
             EheimDigitalClientError: When there is an error with the connection.
 
         """
-        if self.ws is not None:
+        if self.ws is None:
+            return
+        import aiohttp  # noqa: PLC0415
+
+        try:
+            if self.recorder is None and self.hub_metrics is None:
+                await self.ws.send_json(frame, dumps=self.json_dumps)
+            else:
+                await self.ws.send_str(self.encode_frame(frame))
+        except aiohttp.ClientError as err:
+            if self.hub_metrics is not None:
+                self.hub_metrics.send_failures.inc()
+            raise EheimDigitalClientError from err
+
+    def encode_frame(self, frame: dict[str, Any] | list[dict[str, Any]]) -> str:
+        """Encode a frame to send, recording and counting it."""
+        encoded = self.json_dumps(frame)
+        if self.recorder is not None:
+            self.recorder.record(FrameDirection.OUTBOUND, encoded)
+        if (metrics := self.hub_metrics) is not None:
+            metrics.frames_sent.inc()
+            metrics.bytes_sent.inc(amount=len(encoded))
+            for packet in frame if isinstance(frame, list) else (frame,):
+                metrics.packets_sent.inc(str(packet.get("title")))
+        return encoded
+
+    async def flush_outbox(self, options: BatchOptions) -> None:
+        """Send the queued packets as JSON array frames."""
+        await asyncio.sleep(options.window)
+        self._flush_task = None
+        batch, self._outbox = self._outbox, []
+        for start in range(0, len(batch), options.max_packets):
+            chunk = batch[start : start + options.max_packets]
+            error: EheimDigitalClientError | None = None
             try:
-                await self.ws.send_json(packet)
-            except aiohttp.ClientError as err:
-                raise EheimDigitalClientError from err
+                await self.send_batch([packet for packet, _ in chunk], options)
+            except EheimDigitalClientError as err:
+                error = err
+            for _, future in chunk:
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    async def send_batch(
+        self, packets: list[dict[str, Any]], options: BatchOptions
+    ) -> None:
+        """Send packets as an array frame, or one by one if arrays are not supported."""
+        if len(packets) == 1 or self.batch_frames_supported is False:
+            for packet in packets:
+                await self.send_frame(packet)
+        elif self.batch_frames_supported is None:
+            await self.probe_batch(packets, options)
+        else:
+            await self.send_frame(packets)
+
+    async def probe_batch(
+        self, packets: list[dict[str, Any]], options: BatchOptions
+    ) -> None:
+        """Send the requests among packets as an array frame that probes the hub.
+
+        The other packets are sent one by one, so only requests, which can be sent
+        again, are lost if the hub drops array frames. Only one probe is pending.
+        """
+        requests: list[dict[str, Any]] = []
+        expected: set[tuple[str, str]] = set()
+        for packet in packets:
+            if self._batch_probe is None and (
+                responses := self.expected_responses(packet)
+            ):
+                requests.append(packet)
+                expected |= responses
+            else:
+                await self.send_frame(packet)
+        if len(requests) < 2:  # noqa: PLR2004
+            for packet in requests:
+                await self.send_frame(packet)
+            return
+        self._batch_probe = BatchProbe(
+            frozenset(expected),
+            requests,
+            resent=False,
+            timeout_task=self.loop.create_task(
+                self.expire_batch_probe(options.probe_timeout)
+            ),
+        )
+        await self.send_frame(requests)
+
+    def expected_responses(self, packet: dict[str, Any]) -> set[tuple[str, str]]:
+        """Return the senders and titles of the responses to a request packet."""
+        device = self.devices.get(packet["to"])
+        requests = (
+            type(device) if device is not None else EheimDigitalDevice
+        ).refresh_requests
+        return {
+            (packet["to"], response)
+            for response, request in requests.items()
+            if request == packet["title"]
+        }
+
+    def confirm_batch_probe(self, msg: dict[str, Any]) -> None:
+        """Decide whether array frames are supported once a probed request is answered.
+
+        They are, unless the request was only answered after sending it again alone.
+        """
+        if (probe := self._batch_probe) is None or (
+            (msg["from"], msg["title"]) not in probe.expected
+            and ("ALL", msg["title"]) not in probe.expected
+        ):
+            return
+        _ = probe.timeout_task.cancel()
+        self._batch_probe = None
+        self.batch_probe_drops = 0
+        self.batch_frames_supported = not probe.resent
+        if probe.resent:
+            _LOGGER.warning(
+                "%s answered single frames but not the batched one, "
+                "falling back to one frame per packet",
+                self.url,
+            )
+
+    async def expire_batch_probe(self, timeout: float) -> None:  # noqa: ASYNC109
+        """Send the requests of an unanswered probe again, one per frame.
+
+        If they stay unanswered too, the devices are offline rather than the array
+        frame dropped, and a later batch probes again.
+        """
+        await asyncio.sleep(timeout)
+        if (probe := self._batch_probe) is None:
+            return
+        if probe.resent:
+            _LOGGER.debug("Batched frame to %s not answered, probing again", self.url)
+            self._batch_probe = None
+            return
+        self._batch_probe = probe._replace(
+            resent=True,
+            timeout_task=self.loop.create_task(self.expire_batch_probe(timeout)),
+        )
+        try:
+            for packet in probe.packets:
+                await self.send_frame(packet)
+        except EheimDigitalClientError:
+            _LOGGER.debug("Resending the batched packets to %s failed", self.url)
+
+    def drop_batch_probe(self) -> None:
+        """Forget the probe when the connection dropped, falling back if it keeps dropping."""
+        if self._batch_probe is None:
+            return
+        _ = self._batch_probe.timeout_task.cancel()
+        self._batch_probe = None
+        self.batch_probe_drops += 1
+        attempts = (
+            self.batching.probe_attempts
+            if self.batching is not None
+            else DEFAULT_BATCH_PROBE_ATTEMPTS
+        )
+        if self.batch_probe_drops >= attempts:
+            _LOGGER.warning(
+                "Connection to %s dropped after %d batched frames, "
+                "falling back to one frame per packet",
+                self.url,
+                self.batch_probe_drops,
+            )
+            self.batch_frames_supported = False
 
     async def parse_mesh_network(self, msg: MeshNetworkPacket) -> None:
-        """Parse a MESH_NETWORK packet."""
-        for client in msg["clientList"]:
-            if client not in self.devices:
-                await self.request_usrdta(client)
+        """Parse a MESH_NETWORK packet and request all unknown clients at once."""
+        members = {msg["from"], *msg["clientList"]}
+        new = members - self.mesh_members
+        self.mesh_members |= new
+        self._not_ready |= {
+            mac_address
+            for mac_address in new
+            if mac_address not in self.devices or not self.devices[mac_address].has_data
+        }
+        self.check_ready()
+        _ = await asyncio.gather(
+            *(
+                self.request_usrdta(client)
+                for client in msg["clientList"]
+                if client not in self.devices
+            )
+        )
+
+    def check_ready(self, mac_address: str | None = None) -> None:
+        """Mark a device as ready once it has sent data, and the hub once all are."""
+        if (
+            mac_address in self._not_ready
+            and mac_address in self.devices
+            and self.devices[mac_address].has_data
+        ):
+            self._not_ready.discard(mac_address)
+        if self._not_ready:
+            self._ready.clear()
+        elif self.mesh_members and not self._ready.is_set():
+            self._ready.set()
+            if self._connect_started is not None:
+                self.ready_after = self.loop.time() - self._connect_started
+                _LOGGER.debug(
+                    "All %d devices of %s ready after %.2f s",
+                    len(self.mesh_members),
+                    self.url,
+                    self.ready_after,
+                )
+
+    async def wait_ready(self, timeout: float | None = None) -> set[str]:  # noqa: ASYNC109
+        """Wait until every mesh member has sent its USRDTA and a data packet.
+
+        Returns the MAC addresses of the members that are not ready after timeout
+        seconds, which is empty when all are ready.
+
+        Raises:
+            EheimDigitalTimeoutError: When no mesh network was received in time.
 
-    async def parse_usrdta(self, msg: UsrDtaPacket) -> None:
-        """Parse a USRDTA packet."""
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                _ = await self._ready.wait()
+        except TimeoutError:
+            if not self.mesh_members:
+                msg = f"{self.url} did not send its mesh network"
+                raise EheimDigitalTimeoutError(msg) from None
+        return set(self._not_ready)
+
+    def reset_ready(self) -> None:
+        """Forget the mesh network, it is discovered again on (re)connecting."""
+        self._connect_started = self.loop.time()
+        self._not_ready.clear()
+        self._ready.clear()
+        self.mesh_members = set()
+        self.ready_after = None
+
+    async def parse_usrdta(self, msg: UsrDtaPacket) -> dict[str, FieldChange]:
+        """Parse a USRDTA packet and return the changed fields."""
         if msg["from"] not in self.devices:
             await self.add_device(msg)
+            return {key: FieldChange(None, value) for key, value in msg.items()}
+        return self.devices[msg["from"]].update_usrdta(msg)
 
     async def parse_message(self, msg: dict[str, Any]) -> None:
         """Parse a received message."""
@@ -179,15 +927,19 @@ class EheimDigitalHub:
         if "title" not in msg:
             _LOGGER.debug("Received message without 'title' property: %s", msg)
             return
+        if self.hub_metrics is not None:
+            self.hub_metrics.packets_received.inc(msg["title"])
+        self.confirm_batch_probe(msg)
         match msg["title"]:
             case MsgTitle.MESH_NETWORK:
                 _LOGGER.debug("Received mesh network packet: %s", msg)
                 await self.parse_mesh_network(MeshNetworkPacket(**msg))
             case MsgTitle.USRDTA:
                 _LOGGER.debug("Received usrdta packet: %s", msg)
-                await self.parse_usrdta(UsrDtaPacket(**msg))
-                if self.receive_callback:
-                    await self.receive_callback()
+                await self.notify_changes(
+                    msg, await self.parse_usrdta(UsrDtaPacket(**msg))
+                )
+                self.check_ready(msg["from"])
             case _:
                 _LOGGER.debug(
                     "Received packet %s for device %s: %s",
@@ -196,24 +948,128 @@ class EheimDigitalHub:
                     msg,
                 )
                 if "from" in msg and msg["from"] in self.devices:
-                    await self.devices[msg["from"]].parse_message(msg)
-                    if self.receive_callback:
-                        await self.receive_callback()
+                    if self.push_tracker is not None:
+                        self.push_tracker.received(msg["from"], msg["title"])
+                    await self.notify_changes(
+                        msg, await self.devices[msg["from"]].parse_message(msg)
+                    )
+                    self.check_ready(msg["from"])
+        self.resolve_pending(msg)
+
+    def subscribe(
+        self,
+        callback: PacketCallback,
+        *,
+        mac_address: str | None = None,
+        title: str | None = None,
+    ) -> Callable[[], None]:
+        """Subscribe to the packets of a device and/or with a title.
+
+        Returns a function to unsubscribe again.
+        """
+        key = (mac_address, title)
+        self._subscriptions.setdefault(key, []).append(callback)
+
+        def unsubscribe() -> None:
+            callbacks = self._subscriptions.get(key, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                _ = self._subscriptions.pop(key, None)
+
+        return unsubscribe
+
+    async def notify_changes(
+        self, msg: dict[str, Any], changes: dict[str, FieldChange] | None
+    ) -> None:
+        """Notify about a parsed packet, unless it did not change anything."""
+        if changes is not None and not changes:
+            return
+        await self.publish(msg, changes or {})
+        await self.notify_receive(msg["from"])
+
+    async def publish(
+        self, msg: dict[str, Any], changes: dict[str, FieldChange]
+    ) -> None:
+        """Call the subscribers of a received packet."""
+        if not self._subscriptions:
+            return
+        mac_address, title = msg["from"], msg["title"]
+        event = PacketEvent(mac_address, title, msg, changes)
+        for key in (
+            (mac_address, title),
+            (mac_address, None),
+            (None, title),
+            (None, None),
+        ):
+            for callback in tuple(self._subscriptions.get(key, ())):
+                await self.run_callback("subscriber", callback(event))
+
+    async def notify_receive(self, mac_address: str) -> None:
+        """Notify about a received packet, or collect it if coalescing."""
+        if not self.coalesce_callbacks:
+            await self.fire_receive_callbacks(frozenset((mac_address,)))
+            return
+        self._changed.add(mac_address)
+        if self.callback_debounce > 0 and self._debounce_task is None:
+            self._debounce_task = self.loop.create_task(self.debounce_callbacks())
+
+    async def notify_rollback(self, event: RollbackEvent) -> None:
+        """Notify about optimistic values that were rolled back."""
+        _LOGGER.debug(
+            "Rolled back %s of %s: %s", event.attr, event.mac_address, event.changes
+        )
+        if self.rollback_callback:
+            await self.run_callback("rollback", self.rollback_callback(event))
+
+    def schedule_rollback(self, event: RollbackEvent) -> None:
+        """Notify about rolled back values from code that cannot await."""
+        task = self.loop.create_task(self.notify_rollback(event))
+        self._rollback_tasks.add(task)
+        task.add_done_callback(self._rollback_tasks.discard)
+
+    async def debounce_callbacks(self) -> None:
+        """Notify about the collected packets after the debounce time."""
+        await asyncio.sleep(self.callback_debounce)
+        self._debounce_task = None
+        await self.flush_receive_callbacks()
+
+    async def flush_receive_callbacks(self) -> None:
+        """Notify about the packets collected since the last notification."""
+        if not self._changed:
+            return
+        changed, self._changed = frozenset(self._changed), set()
+        await self.fire_receive_callbacks(changed)
+
+    async def fire_receive_callbacks(self, changed: frozenset[str]) -> None:
+        """Call the receive callbacks."""
+        if self.receive_callback:
+            await self.run_callback("receive", self.receive_callback())
+        if self.changes_callback:
+            await self.run_callback("changes", self.changes_callback(changed))
+
+    async def run_callback(self, name: str, call: Awaitable[None]) -> None:
+        """Await a callback, timing it if metrics are collected."""
+        if self.hub_metrics is None:
+            await call
+            return
+        start = perf_counter()
+        try:
+            await call
+        finally:
+            self.hub_metrics.callback_duration.observe(perf_counter() - start, name)
 
     async def receive_messages(self) -> None:
-        """Receive messages from the hub."""
+        """Receive messages from the hub and queue them for dispatching."""
         if self.ws is None or self.ws.closed:
             _LOGGER.error("receive_task called without an established connection!")
             return
+        import aiohttp  # noqa: PLC0415
+
         try:
             async for msg in self.ws:
                 if msg.type == aiohttp.WSMsgType.TEXT:
-                    msgdata: list[dict[str, Any]] | dict[str, Any] = msg.json()
-                    if isinstance(msgdata, list):
-                        for part in msgdata:
-                            await self.parse_message(part)
-                    else:
-                        await self.parse_message(msgdata)
+                    await self.receive_frame(msg.data)
                 elif msg.type == aiohttp.WSMsgType.ERROR:
                     _LOGGER.warning("Received error, reconnecting...:\n%s", msg.data)
                     await self.ws.close()
@@ -227,19 +1083,161 @@ class EheimDigitalHub:
             await self.ws.close()
             return
 
-    async def update(self) -> None:
-        """Update the device states."""
+    async def receive_frame(self, data: str) -> None:
+        """Record a received text frame and queue it for dispatching."""
+        if self.recorder is not None:
+            self.recorder.record(FrameDirection.INBOUND, data)
+        if self.hub_metrics is not None:
+            self.hub_metrics.frames_received.inc()
+            self.hub_metrics.bytes_received.inc(amount=len(data))
+        await self.enqueue_frame(self.json_loads(data))
+
+    async def enqueue_frame(self, frame: list[dict[str, Any]] | dict[str, Any]) -> None:
+        """Put a received frame into the inbound queue."""
+        if self.inbound_overflow == QueueOverflowPolicy.BLOCK:
+            await self.inbound.put(frame)
+            return
+        if self.inbound.full():
+            self.inbound_dropped += 1
+            if self.inbound_overflow == QueueOverflowPolicy.DROP_NEWEST:
+                return
+            _ = self.inbound.get_nowait()
+        self.inbound.put_nowait(frame)
+
+    async def dispatch_messages(self) -> None:
+        """Parse the queued frames."""
+        while True:
+            frame = await self.inbound.get()
+            try:
+                await self.handle_frame(frame)
+            except Exception:
+                _LOGGER.exception("Exception occurred on parsing %s", frame)
+
+    async def handle_frame(self, frame: list[dict[str, Any]] | dict[str, Any]) -> None:
+        """Parse the packets of a received frame."""
+        start = perf_counter() if self.hub_metrics is not None else 0.0
+        if isinstance(frame, list):
+            for part in frame:
+                await self.parse_message(part)
+        else:
+            await self.parse_message(frame)
+        if self.coalesce_callbacks and self.callback_debounce <= 0:
+            await self.flush_receive_callbacks()
+        if self.hub_metrics is not None:
+            self.hub_metrics.frame_duration.observe(perf_counter() - start)
+
+    @property
+    def inbound_queue_depth(self) -> int:
+        """Return the number of received frames waiting to be parsed."""
+        return self.inbound.qsize()
+
+    async def update(self, *, deadline: float | None = None) -> UpdateResult:
+        """Update the device states.
+
+        The devices are refreshed concurrently, at most update_concurrency at a
+        time. With a deadline in seconds, wait for the devices to answer and
+        report the ones that did not answer in time.
+        """
+        result = UpdateResult()
         if self.ws is None or self.ws.closed:
+            if self.supervisor_task is not None and not self.supervisor_task.done():
+                _LOGGER.debug("WebSocket connection to %s is being restored", self.url)
+                return result
             _LOGGER.info("WebSocket connection to %s closed, reconnect...", self.url)
             await self.connect()
         await self.request_usrdta("ALL")
+        return await self.run_on_devices(
+            {
+                device: partial(device.update, wait=deadline is not None)
+                for device in self.devices.values()
+            },
+            deadline,
+        )
+
+    async def refresh_stale(
+        self,
+        ttls: Mapping[str, float],
+        *,
+        default_ttl: float | None = None,
+        deadline: float | None = None,
+    ) -> UpdateResult:
+        """Request only the packets older than their time to live.
+
+        ttls maps packet titles to their time to live in seconds, default_ttl
+        applies to the other packets a device can be asked for. With a deadline
+        in seconds, wait for the devices to answer like update does.
+        """
+        calls: dict[EheimDigitalDevice, Callable[[], Awaitable[None]]] = {}
         for device in self.devices.values():
-            await device.update()
+            stale = [
+                title
+                for title in device.refresh_requests
+                if (ttl := ttls.get(title, default_ttl)) is not None
+                and device.is_stale(title, ttl)
+            ]
+            if stale:
+                calls[device] = partial(
+                    device.refresh, *stale, wait=deadline is not None
+                )
+        return await self.run_on_devices(calls, deadline)
+
+    async def run_on_devices(
+        self,
+        calls: Mapping[EheimDigitalDevice, Callable[[], Awaitable[None]]],
+        deadline: float | None,
+    ) -> UpdateResult:
+        """Run a call per device, at most update_concurrency at a time."""
+        result = UpdateResult()
+        semaphore = asyncio.Semaphore(self.update_concurrency)
+
+        async def run(
+            device: EheimDigitalDevice, call: Callable[[], Awaitable[None]]
+        ) -> None:
+            async with semaphore:
+                try:
+                    await call()
+                except EheimDigitalTimeoutError:
+                    result.timed_out.add(device.mac_address)
+                except EheimDigitalClientError as err:
+                    _LOGGER.warning("Updating %s failed: %s", device.mac_address, err)
+                    result.failed[device.mac_address] = err
+                else:
+                    result.updated.add(device.mac_address)
+
+        tasks = {
+            self.loop.create_task(run(device, call)): device.mac_address
+            for device, call in calls.items()
+        }
+        if not tasks:
+            return result
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            _ = task.cancel()
+            result.timed_out.add(tasks[task])
+        _ = await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            task.result()
+        return result
+
+    def metrics(self) -> str:
+        """Return the metrics of the hub in the Prometheus text format.
+
+        Without collect_metrics, only the connection, queue, rate limiter and
+        heartbeat gauges are included.
+        """
+        return self.metrics_registry.render()
+
+    async def serve_metrics(
+        self, host: str = "127.0.0.1", port: int = DEFAULT_METRICS_PORT
+    ) -> None:
+        """Serve the metrics on http://host:port/metrics until the hub is closed."""
+        if self.metrics_runner is None:
+            self.metrics_runner = await serve_metrics(self.metrics, host, port)
 
     def as_dict(self) -> dict[str, Any]:
         """Return the hub as a dictionary."""
         return {
-            "address": self.url.host,
+            "address": self.host,
             "mac_address": self.main.mac_address if self.main else None,
             "devices": {
                 address: dev.as_dict() for address, dev in self.devices.items()
@@ -0,0 +1,394 @@
+"""Metrics of the Eheim Digital hub in the Prometheus text format."""
+
+from __future__ import annotations
+
+from abc import abstractmethod
+from bisect import bisect_left
+import math
+from typing import TYPE_CHECKING
+
+from .types import ConnectionState
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from aiohttp import web
+
+    from .hub import EheimDigitalHub
+
+type Labels = tuple[str, ...]
+type Samples = dict[Labels, float]
+type Sample = tuple[str, Labels, Labels, float]
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+DEFAULT_METRICS_PORT = 9464
+
+
+def escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value: float) -> str:
+    """Format a sample value."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    """Format the labels of a sample, an empty string without labels."""
+    labels = ",".join(
+        f'{name}="{escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{labels}}}" if labels else ""
+
+
+class Metric:
+    """Represent a metric with samples per label values."""
+
+    kind = "untyped"
+    help: str
+    labelnames: Labels
+    name: str
+
+    def __init__(self, name: str, help_text: str, labelnames: Labels = ()) -> None:
+        """Initialize a metric."""
+        self.help = help_text
+        self.labelnames = labelnames
+        self.name = name
+
+    @abstractmethod
+    def samples(self) -> list[Sample]:
+        """Return the samples as suffix, label names, label values and value."""
+
+    def render(self) -> list[str]:
+        """Return the lines of the metric in the text format."""
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(
+            f"{self.name}{suffix}{format_labels(names, values)} {format_value(value)}"
+            for suffix, names, values, value in self.samples()
+        )
+        return lines
+
+
+class Counter(Metric):
+    """Represent a value that only goes up."""
+
+    kind = "counter"
+    values: Samples
+
+    def __init__(self, name: str, help_text: str, labelnames: Labels = ()) -> None:
+        """Initialize a counter."""
+        super().__init__(name, help_text, labelnames)
+        self.values = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Increase the counter of the label values."""
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> list[Sample]:
+        """Return the values per label values."""
+        return [
+            ("", self.labelnames, labels, value)
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Represent a value that is read when the metrics are rendered."""
+
+    kind = "gauge"
+    collect: Callable[[], Samples | float]
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        collect: Callable[[], Samples | float],
+        labelnames: Labels = (),
+        *,
+        kind: str = "gauge",
+    ) -> None:
+        """Initialize a gauge, collect returns the value or the values per labels.
+
+        kind is counter for totals that are kept elsewhere.
+        """
+        super().__init__(name, help_text, labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self) -> list[Sample]:
+        """Return the collected values."""
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            ("", self.labelnames, labels, value) for labels, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    """Represent the distribution of observed values in buckets."""
+
+    kind = "histogram"
+    buckets: tuple[float, ...]
+    counts: dict[Labels, list[int]]
+    sums: Samples
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Initialize a histogram."""
+        super().__init__(name, help_text, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+        self.counts = {}
+        self.sums = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Add an observed value for the label values."""
+        if (counts := self.counts.get(labels)) is None:
+            counts = self.counts[labels] = [0] * len(self.buckets)
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[labels] = self.sums.get(labels, 0.0) + value
+
+    def samples(self) -> list[Sample]:
+        """Return the cumulative buckets, the sum and the count per label values."""
+        names = (*self.labelnames, "le")
+        samples: list[Sample] = []
+        for labels, counts in self.counts.items():
+            total = 0
+            for bound, count in zip(self.buckets, counts, strict=True):
+                total += count
+                samples.append((
+                    "_bucket",
+                    names,
+                    (*labels, format_value(bound)),
+                    total,
+                ))
+            samples.extend((
+                ("_sum", self.labelnames, labels, self.sums[labels]),
+                ("_count", self.labelnames, labels, total),
+            ))
+        return samples
+
+
+class MetricsRegistry:
+    """Represent a set of metrics rendered together."""
+
+    metrics: dict[str, Metric]
+
+    def __init__(self) -> None:
+        """Initialize a registry."""
+        self.metrics = {}
+
+    def register[M: Metric](self, metric: M) -> M:
+        """Add a metric and return it."""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Labels = ()) -> Counter:
+        """Add a counter and return it."""
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        collect: Callable[[], Samples | float],
+        labelnames: Labels = (),
+        *,
+        kind: str = "gauge",
+    ) -> Gauge:
+        """Add a gauge that is collected on rendering and return it."""
+        return self.register(Gauge(name, help_text, collect, labelnames, kind=kind))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Add a histogram and return it."""
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text format."""
+        return "".join(
+            f"{line}\n" for metric in self.metrics.values() for line in metric.render()
+        )
+
+
+class HubMetrics:
+    """Represent the metrics updated on the receive and send paths of a hub.
+
+    The frames are counted in characters instead of encoding them again, which
+    equals their bytes as long as the JSON is ASCII, like the hub sends it.
+    """
+
+    bytes_received: Counter
+    bytes_sent: Counter
+    callback_duration: Histogram
+    frame_duration: Histogram
+    frames_received: Counter
+    frames_sent: Counter
+    packets_received: Counter
+    packets_sent: Counter
+    reconnects: Counter
+    request_duration: Histogram
+    send_failures: Counter
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        """Initialize the metrics in a registry."""
+        self.frames_received = registry.counter(
+            "eheimdigital_frames_received_total", "Websocket frames received."
+        )
+        self.bytes_received = registry.counter(
+            "eheimdigital_received_bytes_total",
+            "Bytes of the received frames, counted as characters.",
+        )
+        self.packets_received = registry.counter(
+            "eheimdigital_packets_received_total", "Packets received.", ("title",)
+        )
+        self.frames_sent = registry.counter(
+            "eheimdigital_frames_sent_total", "Websocket frames sent."
+        )
+        self.bytes_sent = registry.counter(
+            "eheimdigital_sent_bytes_total",
+            "Bytes of the sent frames, counted as characters.",
+        )
+        self.packets_sent = registry.counter(
+            "eheimdigital_packets_sent_total", "Packets sent.", ("title",)
+        )
+        self.send_failures = registry.counter(
+            "eheimdigital_send_failures_total", "Frames that could not be sent."
+        )
+        self.reconnects = registry.counter(
+            "eheimdigital_reconnects_total", "Restored websocket connections."
+        )
+        self.frame_duration = registry.histogram(
+            "eheimdigital_frame_handling_seconds",
+            "Time spent parsing a received frame, callbacks included.",
+        )
+        self.callback_duration = registry.histogram(
+            "eheimdigital_callback_seconds",
+            "Time spent in the callbacks of the hub.",
+            ("callback",),
+        )
+        self.request_duration = registry.histogram(
+            "eheimdigital_request_seconds",
+            "Time until a request was answered.",
+            ("title",),
+        )
+
+
+def register_hub_gauges(registry: MetricsRegistry, hub: EheimDigitalHub) -> None:
+    """Add the gauges of a hub's connection, queues and existing statistics."""
+    _ = registry.gauge(
+        "eheimdigital_connected",
+        "Whether the websocket is connected.",
+        lambda: float(hub.connection_state == ConnectionState.CONNECTED),
+    )
+    _ = registry.gauge(
+        "eheimdigital_devices", "Known devices.", lambda: len(hub.devices)
+    )
+    _ = registry.gauge(
+        "eheimdigital_inbound_queue_depth",
+        "Received frames waiting to be parsed.",
+        hub.inbound.qsize,
+    )
+    _ = registry.gauge(
+        "eheimdigital_inbound_dropped_total",
+        "Received frames dropped from the full inbound queue.",
+        lambda: hub.inbound_dropped,
+        kind="counter",
+    )
+    _ = registry.gauge(
+        "eheimdigital_deduplicated_requests_total",
+        "GET requests that joined an outstanding request.",
+        lambda: hub.deduplicated_requests,
+        kind="counter",
+    )
+    _ = registry.gauge(
+        "eheimdigital_rate_limit_waiting",
+        "Packets and requests waiting for the rate limiter.",
+        lambda: hub.rate_limiter.waiting,
+    )
+    _ = registry.gauge(
+        "eheimdigital_rate_limit_wait_seconds_total",
+        "Time spent waiting for the rate limiter.",
+        lambda: hub.rate_limiter.wait_time,
+        kind="counter",
+    )
+    _ = registry.gauge(
+        "eheimdigital_in_flight",
+        "Packets and requests in flight per device.",
+        lambda: {
+            (mac_address,): count
+            for mac_address, count in hub.rate_limiter.in_flight.items()
+        },
+        ("mac_address",),
+    )
+    _ = registry.gauge(
+        "eheimdigital_heartbeat_latency_seconds",
+        "Percentiles of the heartbeat round-trip latency.",
+        lambda: {
+            (f"{percent / 100:g}",): latency
+            for percent, latency in hub.latency.percentiles().items()
+            if latency is not None
+        },
+        ("quantile",),
+    )
+    _ = registry.gauge(
+        "eheimdigital_heartbeat_misses",
+        "Heartbeats missed in a row.",
+        lambda: hub.latency.misses,
+    )
+
+
+async def serve_metrics(
+    render: Callable[[], str], host: str, port: int
+) -> web.AppRunner:
+    """Serve the rendered metrics on http://host:port/metrics.
+
+    Returns the runner, its cleanup stops serving.
+    """
+    from aiohttp import web  # noqa: PLC0415
+
+    async def handle(_: web.Request) -> web.Response:  # noqa: RUF029
+        return web.Response(
+            body=render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    _ = app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
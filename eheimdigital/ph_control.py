@@ -6,8 +6,15 @@ from datetime import datetime, time, timedelta, timezone
 from logging import getLogger
 from typing import TYPE_CHECKING, Any, override
 
-from .device import EheimDigitalDevice
+from .device import (
+    EheimDigitalDevice,
+    coalesced_write,
+    optimistic_write,
+    packet_handler,
+)
+from .registry import register_device
 from .types import (
+    EheimDeviceType,
     MsgTitle,
     PHControlErrorCode,
     PHControlMode,
@@ -17,10 +24,12 @@ from .types import (
 
 if TYPE_CHECKING:
     from .hub import EheimDigitalHub
+    from .types import FieldChange
 
 _LOGGER = getLogger(__package__)
 
 
+@register_device(EheimDeviceType.VERSION_EHEIM_PH_CONTROL)
 class EheimDigitalPHControl(EheimDigitalDevice):
     """Represent a EHEIM Digital pHcontrol device."""
 
@@ -30,21 +39,18 @@ class EheimDigitalPHControl(EheimDigitalDevice):
         """Initialize a pHcontrol device."""
         super().__init__(hub, usrdta)
 
-    @override
-    async def parse_message(self, msg: dict[str, Any]) -> None:
-        """Parse a message."""
-        if msg["title"] == MsgTitle.PH_DATA:
-            self.ph_data = PHDataPacket(**msg)
+    @packet_handler(MsgTitle.PH_DATA, request=MsgTitle.GET_PH_DATA)
+    def parse_ph_data(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+        """Parse a PH_DATA packet."""
+        return self.update_packet("ph_data", PHDataPacket(**msg))
 
     @override
-    async def update(self) -> None:
+    async def update(self, *, wait: bool = False) -> None:
         """Get the new device state."""
-        await self.hub.send_packet({
-            "title": MsgTitle.GET_PH_DATA,
-            "to": self.mac_address,
-            "from": "USER",
-        })
+        await self.request_data(MsgTitle.GET_PH_DATA, MsgTitle.PH_DATA, wait=wait)
 
+    @optimistic_write("ph_data")
+    @coalesced_write
     async def set_ph_param(self, data: dict[str, Any]) -> None:
         """Send a SET_PH_PARAM packet, containing new values from data."""
         if self.ph_data is None:
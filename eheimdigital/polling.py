@@ -0,0 +1,98 @@
+"""Push-aware adaptive polling for Eheim Digital devices."""
+
+from __future__ import annotations
+
+from time import monotonic
+
+DEFAULT_MAX_POLL_INTERVAL = 300.0
+DEFAULT_SOLICIT_WINDOW = 5.0
+INTERVAL_SMOOTHING = 0.3
+QUIET_FACTOR = 3.0
+
+
+class PushStream:
+    """Represent the unsolicited arrivals of one packet title from one device."""
+
+    interval: float | None
+    last_push: float
+
+    def __init__(self, now: float) -> None:
+        """Initialize a push stream."""
+        self.interval = None
+        self.last_push = now
+
+    def push(self, now: float) -> None:
+        """Record an unsolicited arrival."""
+        interval = now - self.last_push
+        self.interval = (
+            interval
+            if self.interval is None
+            else self.interval + INTERVAL_SMOOTHING * (interval - self.interval)
+        )
+        self.last_push = now
+
+    def is_streaming(self, now: float) -> bool:
+        """Return whether the packet is still being pushed regularly."""
+        return (
+            self.interval is not None
+            and now - self.last_push <= self.interval * QUIET_FACTOR
+        )
+
+
+class PushTracker:
+    """Track which packets the devices push without being asked.
+
+    Packets arriving within solicit_window seconds after they were requested are
+    answers. All other packets are pushes, and a (device, title) pair that keeps
+    being pushed is only polled every max_poll_interval seconds. Once the pushes
+    stop, the pair is polled on every update again.
+    """
+
+    max_poll_interval: float
+    solicit_window: float
+
+    def __init__(
+        self,
+        *,
+        max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        solicit_window: float = DEFAULT_SOLICIT_WINDOW,
+    ) -> None:
+        """Initialize a push tracker."""
+        self._last_poll: dict[tuple[str, str], float] = {}
+        self._solicited: dict[tuple[str, str], float] = {}
+        self._streams: dict[tuple[str, str], PushStream] = {}
+        self.max_poll_interval = max_poll_interval
+        self.solicit_window = solicit_window
+
+    def solicited(self, mac_address: str, title: str) -> None:
+        """Record that a packet has been requested from a device."""
+        now = monotonic()
+        self._solicited[mac_address, title] = now
+        self._last_poll[mac_address, title] = now
+
+    def received(self, mac_address: str, title: str) -> None:
+        """Record the arrival of a packet."""
+        now = monotonic()
+        key = (mac_address, title)
+        requested = self._solicited.pop(key, None)
+        if requested is not None and now - requested <= self.solicit_window:
+            return
+        if (stream := self._streams.get(key)) is None:
+            self._streams[key] = PushStream(now)
+            _ = self._last_poll.setdefault(key, now)
+        else:
+            stream.push(now)
+
+    def should_poll(self, mac_address: str, title: str) -> bool:
+        """Return whether a packet should be requested from a device."""
+        key = (mac_address, title)
+        stream = self._streams.get(key)
+        now = monotonic()
+        if stream is None or not stream.is_streaming(now):
+            return True
+        return now - self._last_poll[key] >= self.max_poll_interval
+
+    def is_streaming(self, mac_address: str, title: str) -> bool:
+        """Return whether a packet is currently pushed by a device."""
+        stream = self._streams.get((mac_address, title))
+        return stream is not None and stream.is_streaming(monotonic())
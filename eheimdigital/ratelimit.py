@@ -0,0 +1,113 @@
+"""Outbound rate limiting for the Eheim Digital hub."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator
+
+DEFAULT_BURST = 10
+
+
+class RateLimiter:
+    """Limit the packets sent to the hub.
+
+    A token bucket lets at most rate packets per second through, with bursts of
+    up to burst packets. Independently, at most max_in_flight packets or requests
+    per destination MAC address are in flight at the same time. Either limit is
+    disabled when it is None.
+    """
+
+    burst: int
+    max_in_flight: int | None
+    max_wait_time: float
+    rate: float | None
+    tokens: float
+    wait_time: float
+    waiting: int
+
+    def __init__(
+        self,
+        *,
+        rate: float | None = None,
+        burst: int = DEFAULT_BURST,
+        max_in_flight: int | None = None,
+    ) -> None:
+        """Initialize a rate limiter."""
+        self._in_flight: dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        self._updated = monotonic()
+        self.burst = max(burst, 1)
+        self.max_in_flight = max_in_flight
+        self.max_wait_time = 0.0
+        self.rate = rate
+        self.tokens = float(self.burst)
+        self.wait_time = 0.0
+        self.waiting = 0
+
+    def refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = monotonic()
+        if self.rate is not None:
+            self.tokens = min(
+                self.burst, self.tokens + (now - self._updated) * self.rate
+            )
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a packet may be sent."""
+        if self.rate is None:
+            return
+        start = monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self.refill()
+                if self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    self.refill()
+                self.tokens -= 1
+        finally:
+            self.waiting -= 1
+            self.record_wait(monotonic() - start)
+
+    @asynccontextmanager
+    async def slot(self, mac_address: str | None) -> AsyncGenerator[None]:
+        """Hold one of the in-flight slots of a destination."""
+        if self.max_in_flight is None or mac_address is None:
+            yield
+            return
+        if (semaphore := self._slots.get(mac_address)) is None:
+            semaphore = self._slots[mac_address] = asyncio.Semaphore(self.max_in_flight)
+        start = monotonic()
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+            self.record_wait(monotonic() - start)
+        self._in_flight[mac_address] = self._in_flight.get(mac_address, 0) + 1
+        try:
+            yield
+        finally:
+            self._in_flight[mac_address] -= 1
+            semaphore.release()
+
+    def record_wait(self, wait: float) -> None:
+        """Add a wait to the wait time statistics."""
+        self.wait_time += wait
+        self.max_wait_time = max(self.max_wait_time, wait)
+
+    @property
+    def in_flight(self) -> dict[str, int]:
+        """Return the packets or requests in flight per destination."""
+        return {
+            mac_address: count
+            for mac_address, count in self._in_flight.items()
+            if count > 0
+        }
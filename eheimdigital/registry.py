@@ -0,0 +1,76 @@
+"""Registry of the Eheim Digital device classes."""
+
+from __future__ import annotations
+
+from importlib import import_module
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+from .device import EheimDigitalDevice
+from .types import EheimDeviceType
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+_LOGGER = getLogger(__package__)
+
+ENTRY_POINT_GROUP = "eheimdigital.devices"
+
+BUILTIN_DEVICE_MODULES: dict[EheimDeviceType, str] = {
+    EheimDeviceType.VERSION_EHEIM_CLASSIC_LED_CTRL_PLUS_E: "classic_led_ctrl",
+    EheimDeviceType.VERSION_EHEIM_CLASSIC_VARIO: "classic_vario",
+    EheimDeviceType.VERSION_EHEIM_EXT_FILTER: "filter",
+    EheimDeviceType.VERSION_EHEIM_EXT_HEATER: "heater",
+    EheimDeviceType.VERSION_EHEIM_FEEDER: "autofeeder",
+    EheimDeviceType.VERSION_EHEIM_PH_CONTROL: "ph_control",
+}
+
+DEVICE_CLASSES: dict[EheimDeviceType, type[EheimDigitalDevice]] = {}
+
+_entry_points_loaded = False
+
+
+def register_device[D: type[EheimDigitalDevice]](
+    device_type: EheimDeviceType,
+) -> Callable[[D], D]:
+    """Register a device class for a device type."""
+
+    def decorator(cls: D) -> D:
+        DEVICE_CLASSES[device_type] = cls
+        return cls
+
+    return decorator
+
+
+def load_entry_points() -> None:
+    """Register the device classes of the eheimdigital.devices entry points.
+
+    The entry point name is the name or the number of the device type.
+    """
+    global _entry_points_loaded  # noqa: PLW0603
+    if _entry_points_loaded:
+        return
+    from importlib.metadata import entry_points  # noqa: PLC0415
+
+    _entry_points_loaded = True
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            device_type = (
+                EheimDeviceType(int(entry_point.name))
+                if entry_point.name.isdigit()
+                else EheimDeviceType[entry_point.name]
+            )
+            DEVICE_CLASSES[device_type] = entry_point.load()
+        except Exception:
+            _LOGGER.exception("Loading device entry point %s failed", entry_point)
+
+
+def get_device_class(device_type: EheimDeviceType) -> type[EheimDigitalDevice]:
+    """Return the device class of a device type, or the generic device class.
+
+    The module of a built-in device class is imported when its type is first seen.
+    """
+    load_entry_points()
+    if device_type not in DEVICE_CLASSES and device_type in BUILTIN_DEVICE_MODULES:
+        _ = import_module(f".{BUILTIN_DEVICE_MODULES[device_type]}", __package__)
+    return DEVICE_CLASSES.get(device_type, EheimDigitalDevice)
@@ -0,0 +1,625 @@
+"""Simulator of an Eheim Digital hub for offline load and integration tests.
+
+Run with ``python -m eheimdigital.simulator``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from contextlib import suppress
+from logging import getLogger
+import random
+import time
+from typing import TYPE_CHECKING, Any, NamedTuple, Self
+
+from aiohttp import WSMsgType, web
+
+from .codec import default_codec
+from .filter import NOCTURNAL_MODE_FIELDS, PULSE_MODE_FIELDS
+from .registry import get_device_class
+from .types import EheimDeviceType, FilterMode, FilterModeProf, LightMode, MsgTitle
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping
+    from types import TracebackType
+
+_LOGGER = getLogger(__package__)
+
+DEFAULT_PUSH_INTERVAL = 5.0
+
+SIMULATED_DEVICE_TYPES = (
+    EheimDeviceType.VERSION_EHEIM_EXT_HEATER,
+    EheimDeviceType.VERSION_EHEIM_EXT_FILTER,
+    EheimDeviceType.VERSION_EHEIM_CLASSIC_VARIO,
+    EheimDeviceType.VERSION_EHEIM_CLASSIC_LED_CTRL_PLUS_E,
+    EheimDeviceType.VERSION_EHEIM_PH_CONTROL,
+    EheimDeviceType.VERSION_EHEIM_FEEDER,
+)
+
+DATA_PACKETS: dict[EheimDeviceType, dict[str, dict[str, Any]]] = {
+    EheimDeviceType.VERSION_EHEIM_EXT_HEATER: {
+        MsgTitle.HEATER_DATA: {
+            "mUnit": 0,
+            "sollTemp": 250,
+            "isTemp": 249,
+            "hystLow": 5,
+            "hystHigh": 5,
+            "offset": 0,
+            "active": 1,
+            "isHeating": 0,
+            "mode": 0,
+            "sync": "",
+            "partnerName": "",
+            "dayStartT": 480,
+            "nightStartT": 1200,
+            "nReduce": 0,
+            "alertState": 0,
+        },
+    },
+    EheimDeviceType.VERSION_EHEIM_EXT_FILTER: {
+        MsgTitle.FILTER_DATA: {
+            "minFreq": 3500,
+            "maxFreq": 7000,
+            "maxFreqRglOff": 6000,
+            "freq": 5000,
+            "freqSoll": 5000,
+            "dfs": 520,
+            "dfsFaktor": 100,
+            "sollStep": 8,
+            "rotSpeed": 3000,
+            "pumpMode": FilterModeProf.MANUAL,
+            "sync": "",
+            "partnerName": "",
+            "filterActive": 1,
+            "runTime": 0,
+            "actualTime": 0,
+            "serviceHour": 4000,
+            "pm_dfs_soll_high": 12,
+            "pm_dfs_soll_low": 4,
+            "pm_time_high": 10,
+            "pm_time_low": 5,
+            "nm_dfs_soll_day": 12,
+            "nm_dfs_soll_night": 4,
+            "end_time_night_mode": 480,
+            "start_time_night_mode": 1200,
+            "version": 76,
+            "isEheim": 1,
+            "turnOffTime": 0,
+            "turnTimeFeeding": 0,
+        },
+    },
+    EheimDeviceType.VERSION_EHEIM_CLASSIC_VARIO: {
+        MsgTitle.CLASSIC_VARIO_DATA: {
+            "rel_speed": 56,
+            "pumpMode": FilterMode.MANUAL,
+            "filterActive": 1,
+            "turnOffTime": 0,
+            "serviceHour": 3683,
+            "rel_manual_motor_speed": 56,
+            "rel_motor_speed_day": 56,
+            "rel_motor_speed_night": 20,
+            "startTime_day": 600,
+            "startTime_night": 1080,
+            "pulse_motorSpeed_High": 100,
+            "pulse_motorSpeed_Low": 20,
+            "pulse_Time_High": 100,
+            "pulse_Time_Low": 50,
+            "turnTimeFeeding": 0,
+            "errorCode": 0,
+            "version": 0,
+        },
+    },
+    EheimDeviceType.VERSION_EHEIM_CLASSIC_LED_CTRL_PLUS_E: {
+        MsgTitle.CCV: {"currentValues": [0, 60]},
+        MsgTitle.MOON: {
+            "maxmoonlight": 10,
+            "minmoonlight": 2,
+            "moonlightActive": 1,
+            "moonlightCycle": 1,
+        },
+        MsgTitle.CLOUD: {
+            "probability": 50,
+            "maxAmount": 90,
+            "minIntensity": 60,
+            "maxIntensity": 100,
+            "minDuration": 600,
+            "maxDuration": 1500,
+            "cloudActive": 0,
+            "mode": 2,
+        },
+        MsgTitle.ACCLIMATE: {
+            "duration": 7,
+            "intensityReduction": 50,
+            "currentAcclDay": 0,
+            "acclActive": 0,
+            "pause": 0,
+        },
+    },
+    EheimDeviceType.VERSION_EHEIM_PH_CONTROL: {
+        MsgTitle.PH_DATA: {
+            "sollPH": 68,
+            "isPH": 70,
+            "active": 1,
+            "hystLow": 1,
+            "hystHigh": 1,
+            "offset": 0,
+            "valveIsActive": 0,
+            "acclimatization": 0,
+            "mode": 0,
+            "expert": 0,
+            "sync": "",
+            "partnerName": "",
+            "dayStartT": 480,
+            "nightStartT": 1200,
+            "nReduce": 0,
+            "alertState": 0,
+            "serviceTime": 0,
+            "kH": 6,
+            "schedule": [[0, 0, 0], [0, 0, 0]],
+        },
+    },
+    EheimDeviceType.VERSION_EHEIM_FEEDER: {
+        MsgTitle.FEEDER_DATA: {
+            "weight": 25.0,
+            "isSpinning": 0,
+            "level": [0, 0],
+            "configuration": [[480, 1], [1080, 1]],
+            "overfeeding": 0,
+            "sync": "",
+            "partnerName": "",
+            "sollRegulation": 0,
+            "feedingBreak": 0,
+            "breakDay": 0,
+            "turnTimeFeeding": 0,
+        },
+    },
+}
+
+
+class Write(NamedTuple):
+    """Represent how a written packet changes a data packet of a device."""
+
+    title: str
+    fields: Mapping[str, str] = {}
+    values: Mapping[str, Any] = {}
+
+
+WRITES: dict[str, Write] = {
+    MsgTitle.SET_EHEATER_PARAM: Write(MsgTitle.HEATER_DATA),
+    "SET_CLASSIC_VARIO_PARAM": Write(MsgTitle.CLASSIC_VARIO_DATA),
+    MsgTitle.PH_DATA: Write(MsgTitle.PH_DATA),
+    MsgTitle.SET_FEEDER_DATA: Write(MsgTitle.FEEDER_DATA),
+    MsgTitle.SET_FILTER_PUMP: Write(MsgTitle.FILTER_DATA, {"active": "filterActive"}),
+    MsgTitle.START_FILTER_NORMAL_MODE_WITHOUT_COMP: Write(
+        MsgTitle.FILTER_DATA,
+        {"frequency": "freqSoll"},
+        {"pumpMode": FilterModeProf.MANUAL},
+    ),
+    MsgTitle.START_FILTER_NORMAL_MODE_WITH_COMP: Write(
+        MsgTitle.FILTER_DATA,
+        {"flow_rate": "sollStep"},
+        {"pumpMode": FilterModeProf.CONSTANT_FLOW},
+    ),
+    MsgTitle.START_FILTER_PULSE_MODE: Write(
+        MsgTitle.FILTER_DATA, PULSE_MODE_FIELDS, {"pumpMode": FilterModeProf.PULSE}
+    ),
+    MsgTitle.START_NOCTURNAL_MODE: Write(
+        MsgTitle.FILTER_DATA, NOCTURNAL_MODE_FIELDS, {"pumpMode": FilterModeProf.BIO}
+    ),
+    "CCV-SL": Write(MsgTitle.CCV),
+    MsgTitle.MOON: Write(MsgTitle.MOON),
+    MsgTitle.CLOUD: Write(MsgTitle.CLOUD),
+    MsgTitle.ACCLIMATE: Write(MsgTitle.ACCLIMATE),
+    MsgTitle.SET_MANUAL_FEED: Write(MsgTitle.FEEDER_DATA),
+    MsgTitle.SET_FEEDER_FULL: Write(MsgTitle.FEEDER_DATA, values={"level": [0, 0]}),
+    MsgTitle.SET_FEEDER_TARA: Write(MsgTitle.FEEDER_DATA, values={"weight": 0.0}),
+    MsgTitle.SET_MANUAL_MEASUREMENT: Write(MsgTitle.FEEDER_DATA),
+    MsgTitle.SET_STOP_FEEDER_SYNC: Write(
+        MsgTitle.FEEDER_DATA, values={"sync": "", "partnerName": ""}
+    ),
+}
+
+
+def step(rng: random.Random, value: float, target: float, spread: float) -> float:
+    """Return value moved randomly, but kept within spread of target."""
+    value += rng.choice((-1, 0, 1)) * spread / 4
+    return min(max(value, target - spread), target + spread)
+
+
+def drift_heater(rng: random.Random, packet: dict[str, Any]) -> dict[str, Any]:
+    """Return the heater data after the water temperature changed a little."""
+    is_temp = int(step(rng, packet["isTemp"], packet["sollTemp"], 8))
+    return {
+        "isTemp": is_temp,
+        "isHeating": int(
+            bool(packet["active"]) and is_temp < packet["sollTemp"] - packet["hystLow"]
+        ),
+    }
+
+
+def drift_filter(rng: random.Random, packet: dict[str, Any]) -> dict[str, Any]:
+    """Return the filter data after the pump frequency changed a little."""
+    if not packet["filterActive"]:
+        return {"freq": 0, "rotSpeed": 0}
+    freq = int(step(rng, packet["freq"], packet["freqSoll"], 100))
+    return {"freq": freq, "rotSpeed": freq * 3 // 5, "runTime": packet["runTime"] + 1}
+
+
+def drift_classic_vario(rng: random.Random, packet: dict[str, Any]) -> dict[str, Any]:
+    """Return the classicVARIO data after the pump speed changed a little."""
+    if not packet["filterActive"]:
+        return {"rel_speed": 0}
+    return {
+        "rel_speed": int(
+            step(rng, packet["rel_speed"], packet["rel_manual_motor_speed"], 4)
+        )
+    }
+
+
+def drift_ph(rng: random.Random, packet: dict[str, Any]) -> dict[str, Any]:
+    """Return the pHcontrol data after the pH value changed a little."""
+    is_ph = int(step(rng, packet["isPH"], packet["sollPH"], 4))
+    return {
+        "isPH": is_ph,
+        "valveIsActive": int(
+            bool(packet["active"]) and is_ph > packet["sollPH"] + packet["hystHigh"]
+        ),
+    }
+
+
+def drift_feeder(rng: random.Random, packet: dict[str, Any]) -> dict[str, Any]:
+    """Return the feeder data after the measured weight changed a little."""
+    return {"weight": round(max(packet["weight"] + rng.uniform(-0.1, 0.1), 0.0), 2)}
+
+
+DRIFTS: dict[str, Callable[[random.Random, dict[str, Any]], dict[str, Any]]] = {
+    MsgTitle.HEATER_DATA: drift_heater,
+    MsgTitle.FILTER_DATA: drift_filter,
+    MsgTitle.CLASSIC_VARIO_DATA: drift_classic_vario,
+    MsgTitle.PH_DATA: drift_ph,
+    MsgTitle.FEEDER_DATA: drift_feeder,
+}
+
+
+class SimulatedDevice:
+    """Represent a simulated Eheim Digital device."""
+
+    device_type: EheimDeviceType
+    mac_address: str
+    packets: dict[str, dict[str, Any]]
+    requests: dict[str, str]
+    usrdta: dict[str, Any]
+
+    def __init__(self, device_type: EheimDeviceType, index: int) -> None:
+        """Initialize a simulated device, the index makes its MAC address unique."""
+        self.device_type = device_type
+        self.mac_address = (
+            f"00:EE:{device_type:02X}:{index >> 16 & 0xFF:02X}:"
+            f"{index >> 8 & 0xFF:02X}:{index & 0xFF:02X}"
+        )
+        self.packets = {
+            title: {"title": title, "from": self.mac_address, **fields, "to": "USER"}
+            for title, fields in DATA_PACKETS[device_type].items()
+        }
+        self.requests = {
+            request: title
+            for title, request in get_device_class(device_type).refresh_requests.items()
+        }
+        light = device_type == EheimDeviceType.VERSION_EHEIM_CLASSIC_LED_CTRL_PLUS_E
+        self.usrdta = {
+            "title": MsgTitle.USRDTA,
+            "from": self.mac_address,
+            "name": f"{device_type.model_name} {index + 1}",
+            "aqName": "Simulator",
+            "mode": LightMode.DAYCL_MODE,
+            "version": int(device_type),
+            "language": "EN",
+            "timezone": 60,
+            "tID": 30,
+            "dst": 1,
+            "tankconfig": '[[],["CLASSIC_DAYLIGHT"]]' if light else "",
+            "power": "[[],[17]]" if light else "",
+            "netmode": "ST",
+            "host": "eheimdigital",
+            "groupID": 0,
+            "meshing": 1,
+            "firstStart": 0,
+            "revision": [2036, 2036],
+            "latestAvailableRevision": [-1, -1, -1, -1],
+            "firmwareAvailable": 0,
+            "softChange": 0,
+            "emailAddr": "",
+            "liveTime": 0,
+            "usrName": "",
+            "unit": 0,
+            "demoUse": 0,
+            "sysLED": 100,
+            "to": "USER",
+        }
+
+    def clock(self) -> dict[str, Any]:
+        """Return a CLOCK packet with the current local time."""
+        now = time.localtime()
+        return {
+            "title": MsgTitle.CLOCK,
+            "from": self.mac_address,
+            "year": now.tm_year,
+            "month": now.tm_mon,
+            "day": now.tm_mday,
+            "hour": now.tm_hour,
+            "min": now.tm_min,
+            "sec": now.tm_sec,
+            "mode": self.usrdta["mode"],
+            "valid": 1,
+            "to": "USER",
+        }
+
+    def current(self, title: str) -> dict[str, Any] | None:
+        """Return the current packet with a title, None if the device has none."""
+        if title == MsgTitle.CLOCK:
+            return self.clock()
+        if title == MsgTitle.USRDTA:
+            return self.usrdta
+        return self.packets.get(title)
+
+    def answer(self, packet: dict[str, Any]) -> dict[str, Any] | None:
+        """Handle a packet sent to the device and return its answer, if any."""
+        title = packet["title"]
+        data = {
+            key: value
+            for key, value in packet.items()
+            if key not in {"title", "to", "from"}
+        }
+        if title in self.requests:
+            return self.current(self.requests[title])
+        if title in LightMode.__members__:
+            self.usrdta = {**self.usrdta, "mode": title}
+            return self.usrdta
+        if title == MsgTitle.USRDTA:
+            self.usrdta = {
+                **self.usrdta,
+                **{key: value for key, value in data.items() if key in self.usrdta},
+            }
+            return self.usrdta
+        if (write := WRITES.get(title)) is None or write.title not in self.packets:
+            _LOGGER.debug("%s ignores packet %s", self.mac_address, title)
+            return None
+        target = self.packets[write.title]
+        fields = {write.fields.get(key, key): value for key, value in data.items()}
+        self.packets[write.title] = {
+            **target,
+            **{key: value for key, value in fields.items() if key in target},
+            **write.values,
+        }
+        return self.packets[write.title]
+
+    def drift(self, rng: random.Random) -> list[dict[str, Any]]:
+        """Let the measured values change and return the packets to push."""
+        self.usrdta["liveTime"] += 1
+        pushed = []
+        for title, packet in self.packets.items():
+            if (drift := DRIFTS.get(title)) is not None:
+                self.packets[title] = {**packet, **drift(rng, packet)}
+                pushed.append(self.packets[title])
+        if MsgTitle.CCV in self.packets:
+            pushed.extend((self.packets[MsgTitle.CCV], self.clock()))
+        return pushed
+
+
+class EheimDigitalSimulator:
+    """Simulate an Eheim Digital hub, a master device with its mesh of devices.
+
+    The devices answer the GET and SET packets of the library, and push their
+    data packets with slightly changing values every push_interval seconds.
+    Every answer is delayed by latency seconds.
+    """
+
+    address: str | None = None
+    devices: dict[str, SimulatedDevice]
+    latency: float
+    master: SimulatedDevice
+    packets_received: int
+    packets_sent: int
+    push_interval: float | None
+    push_task: asyncio.Task[None] | None = None
+    runner: web.AppRunner | None = None
+
+    def __init__(
+        self,
+        *,
+        devices_per_type: int = 1,
+        device_types: Iterable[EheimDeviceType] = SIMULATED_DEVICE_TYPES,
+        latency: float = 0.0,
+        push_interval: float | None = DEFAULT_PUSH_INTERVAL,
+        seed: int | None = None,
+    ) -> None:
+        """Initialize a simulator with devices_per_type devices of every device type.
+
+        Without push_interval, the devices only answer requests. seed makes the
+        changing values reproducible.
+        """
+        self._clients: set[web.WebSocketResponse] = set()
+        self._tasks: set[asyncio.Task[None]] = set()
+        self.json_loads, self.json_dumps = default_codec()
+        self.devices = {
+            device.mac_address: device
+            for index in range(devices_per_type)
+            for device_type in device_types
+            for device in (SimulatedDevice(device_type, index),)
+        }
+        self.latency = latency
+        self.master = next(iter(self.devices.values()))
+        self.packets_received = 0
+        self.packets_sent = 0
+        self.push_interval = push_interval
+        self.rng = random.Random(seed)  # noqa: S311
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving on host and port, and return the address as host:port.
+
+        With port 0, a free port is chosen.
+        """
+        app = web.Application()
+        _ = app.router.add_get("/ws", self.handle_websocket)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        bound_host, bound_port = self.runner.addresses[0][:2]
+        self.address = f"{bound_host}:{bound_port}"
+        if self.push_interval is not None:
+            self.push_task = asyncio.create_task(self.push_data())
+        _LOGGER.info("Simulating %d devices on %s", len(self.devices), self.address)
+        return self.address
+
+    async def stop(self) -> None:
+        """Stop serving and close the connections."""
+        if self.push_task is not None:
+            _ = self.push_task.cancel()
+            self.push_task = None
+        for task in self._tasks:
+            _ = task.cancel()
+        for ws in tuple(self._clients):
+            _ = await ws.close()
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def __aenter__(self) -> Self:
+        """Start serving on a free port of 127.0.0.1."""
+        _ = await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop serving."""
+        await self.stop()
+
+    async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """Serve a websocket client like the master device does."""
+        ws = web.WebSocketResponse()
+        _ = await ws.prepare(request)
+        self._clients.add(ws)
+        try:
+            await self.send(ws, self.master.usrdta)
+            await self.send(
+                ws,
+                {
+                    "title": MsgTitle.MESH_NETWORK,
+                    "from": self.master.mac_address,
+                    "clientList": [
+                        mac_address
+                        for mac_address in self.devices
+                        if mac_address != self.master.mac_address
+                    ],
+                    "to": "USER",
+                },
+            )
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                frame = msg.json(loads=self.json_loads)
+                for packet in frame if isinstance(frame, list) else (frame,):
+                    self.handle_packet(ws, packet)
+        finally:
+            self._clients.discard(ws)
+        return ws
+
+    def handle_packet(self, ws: web.WebSocketResponse, packet: dict[str, Any]) -> None:
+        """Let the addressed devices answer a received packet."""
+        self.packets_received += 1
+        if "title" not in packet or "to" not in packet:
+            return
+        if packet["to"] == "ALL":
+            devices = list(self.devices.values())
+        elif packet["to"] in self.devices:
+            devices = [self.devices[packet["to"]]]
+        else:
+            return
+        answers = [
+            answer
+            for device in devices
+            if (answer := device.answer(packet)) is not None
+        ]
+        if answers:
+            task = asyncio.create_task(self.reply(ws, answers))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def reply(
+        self, ws: web.WebSocketResponse, packets: list[dict[str, Any]]
+    ) -> None:
+        """Send answers after the simulated latency."""
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        for packet in packets:
+            await self.send(ws, packet)
+
+    async def push_data(self) -> None:
+        """Push the changing data packets of all devices to all clients."""
+        while True:
+            await asyncio.sleep(self.push_interval or 0)
+            packets = [
+                packet
+                for device in self.devices.values()
+                for packet in device.drift(self.rng)
+            ]
+            for ws in tuple(self._clients):
+                for packet in packets:
+                    await self.send(ws, packet)
+
+    async def send(self, ws: web.WebSocketResponse, packet: dict[str, Any]) -> None:
+        """Send a packet to a client, unless it has disconnected."""
+        if ws.closed:
+            return
+        with suppress(ConnectionError):
+            await ws.send_str(self.json_dumps(packet))
+            self.packets_sent += 1
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """Run a simulator until it is cancelled."""
+    simulator = EheimDigitalSimulator(
+        devices_per_type=args.devices,
+        latency=args.latency,
+        push_interval=args.push_interval or None,
+        seed=args.seed,
+    )
+    address = await simulator.start(args.host, args.port)
+    print(f"Simulating {len(simulator.devices)} devices on {address}")  # noqa: T201
+    try:
+        _ = await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+def main() -> None:
+    """Parse the command line and run a simulator."""
+    parser = argparse.ArgumentParser(
+        prog="python -m eheimdigital.simulator", description=__doc__
+    )
+    _ = parser.add_argument("--host", default="127.0.0.1")
+    _ = parser.add_argument("--port", type=int, default=8080)
+    _ = parser.add_argument(
+        "--devices", type=int, default=1, help="devices per device type"
+    )
+    _ = parser.add_argument(
+        "--latency", type=float, default=0.0, help="answer delay in seconds"
+    )
+    _ = parser.add_argument(
+        "--push-interval",
+        type=float,
+        default=DEFAULT_PUSH_INTERVAL,
+        help="seconds between data pushes, 0 to disable",
+    )
+    _ = parser.add_argument("--seed", type=int, default=None)
+    with suppress(KeyboardInterrupt):
+        asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Snapshots of the hub state for warm starts."""
+
+from __future__ import annotations
+
+import gzip
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, Any
+
+from .types import EheimDigitalClientError, MsgTitle, UsrDtaPacket
+
+if TYPE_CHECKING:
+    from os import PathLike
+
+    from .codec import JsonLoads
+    from .hub import EheimDigitalHub
+
+SNAPSHOT_VERSION = 1
+
+
+def create_snapshot(hub: EheimDigitalHub) -> dict[str, Any]:
+    """Return the devices of a hub, with their latest packets and their ages."""
+    devices: dict[str, Any] = {}
+    for mac_address, device in hub.devices.items():
+        packets = device.stored_packets()
+        devices[mac_address] = {
+            "usrdta": packets.pop("usrdta", device.usrdta),
+            "packets": list(packets.values()),
+            "ages": {
+                str(title): age
+                for title in device.received_at
+                if (age := device.age(title)) is not None
+            },
+        }
+    return {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "mac_address": hub.main.mac_address if hub.main else None,
+        "devices": devices,
+    }
+
+
+async def restore_snapshot(hub: EheimDigitalHub, snapshot: dict[str, Any]) -> None:
+    """Add the devices of a snapshot to a hub and restore their packets.
+
+    The packets keep their age, so they become stale like they would have.
+
+    Raises:
+        EheimDigitalClientError: When the snapshot has an unknown version.
+
+    """
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        msg = f"Unsupported snapshot version {snapshot.get('version')}"
+        raise EheimDigitalClientError(msg)
+    offline = max(time.time() - snapshot["saved_at"], 0.0)
+    for mac_address, state in snapshot["devices"].items():
+        await hub.add_device(UsrDtaPacket(**state["usrdta"]))
+        device = hub.devices[mac_address]
+        for packet in state["packets"]:
+            _ = await device.parse_message(packet)
+        now = time.monotonic()
+        device.received_at = {
+            title: now - age - offline
+            for title, age in state["ages"].items()
+            if title == MsgTitle.USRDTA or title in device.packet_handlers
+        }
+    if (main := snapshot["mac_address"]) in hub.devices:
+        hub.main = hub.devices[main]
+
+
+def write_snapshot(path: str | PathLike[str], encoded: str) -> None:
+    """Write an encoded snapshot, gzipped if the path ends with .gz."""
+    path = Path(path)
+    data = encoded.encode()
+    if path.suffix == ".gz":
+        data = gzip.compress(data)
+    temp = path.with_name(f".{path.name}.tmp")
+    _ = temp.write_bytes(data)
+    _ = temp.replace(path)
+
+
+def read_snapshot(path: str | PathLike[str], loads: JsonLoads) -> dict[str, Any]:
+    """Read a snapshot written by write_snapshot."""
+    path = Path(path)
+    data = path.read_bytes()
+    if path.suffix == ".gz":
+        data = gzip.decompress(data)
+    return loads(data)
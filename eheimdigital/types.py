@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from enum import IntEnum, StrEnum
-from typing import Literal, NotRequired, TypedDict
+from typing import Any, Literal, NamedTuple, NotRequired, TypedDict
 
 
 class UnitOfMeasurement(IntEnum):
@@ -85,6 +86,30 @@ class FeederDrumState(IntEnum):
     MEASURING = 5
 
 
+class ConnectionState(StrEnum):
+    """Hub connection state."""
+
+    DISCONNECTED = "disconnected"
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    RECONNECTING = "reconnecting"
+
+
+class QueueOverflowPolicy(StrEnum):
+    """Behaviour when the inbound message queue is full."""
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+
+class FrameDirection(StrEnum):
+    """Direction of a recorded websocket frame."""
+
+    INBOUND = "<"
+    OUTBOUND = ">"
+
+
 class MsgTitle(StrEnum):
     """Represent a message title."""
 
@@ -103,6 +128,11 @@ class MsgTitle(StrEnum):
     MOON = "MOON"
     CLOUD = "CLOUD"
     ACCLIMATE = "ACCLIMATE"
+    REQ_CCV = "REQ_CCV"
+    GET_CLOCK = "GET_CLOCK"
+    GET_MOON = "GET_MOON"
+    GET_CLOUD = "GET_CLOUD"
+    GET_ACCL = "GET_ACCL"
     REQ_KEEP_ALIVE = "REQ_KEEP_ALIVE"
     PH_DATA = "PH_DATA"
     GET_PH_DATA = "GET_PH_DATA"
@@ -437,9 +467,66 @@ FeederDataPacket = TypedDict(
 )
 
 
+class FieldChange(NamedTuple):
+    """Old and new value of a changed packet field."""
+
+    old: Any
+    new: Any
+
+
+@dataclass(frozen=True, slots=True)
+class PacketEvent:
+    """A packet received from a device, with the fields that changed."""
+
+    mac_address: str
+    title: str
+    packet: dict[str, Any]
+    changes: dict[str, FieldChange] = field(default_factory=dict)
+
+
+@dataclass(frozen=True, slots=True)
+class RollbackEvent:
+    """Optimistic field values of a device that were rolled back.
+
+    The changes go from the optimistic value to the value of the device.
+    """
+
+    mac_address: str
+    attr: str
+    changes: dict[str, FieldChange]
+
+
+@dataclass
+class UpdateResult:
+    """Summary of a hub update cycle."""
+
+    updated: set[str] = field(default_factory=set)
+    timed_out: set[str] = field(default_factory=set)
+    failed: dict[str, EheimDigitalClientError] = field(default_factory=dict)
+
+
+@dataclass
+class ReplayResult:
+    """Summary of a replayed capture.
+
+    span is the time covered by the capture, elapsed the time the replay took,
+    both in seconds.
+    """
+
+    frames: int = 0
+    packets: int = 0
+    sent: int = 0
+    span: float = 0.0
+    elapsed: float = 0.0
+
+
 class EheimDigitalClientError(Exception):
     """EHEIM Digital client error."""
 
     def __init__(self, *args: object) -> None:
         """Initialize exception."""
         super().__init__(*args)
+
+
+class EheimDigitalTimeoutError(EheimDigitalClientError):
+    """EHEIM Digital device did not answer a request in time."""
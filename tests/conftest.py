@@ -0,0 +1,107 @@
+"""Fixtures for the EHEIM.digital tests."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from unittest.mock import AsyncMock, Mock
+
+import aiohttp
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def load_fixture(name: str) -> dict[str, Any]:
+    """Load a JSON fixture."""
+    return json.loads(
+        (Path(__file__).parent / "fixtures" / name).read_text(encoding="utf8")
+    )
+
+
+class FakeWebSocket:
+    """Minimal stand-in for an aiohttp client websocket."""
+
+    def __init__(self) -> None:
+        """Initialize the fake websocket."""
+        self.closed = False
+        self.sent: list[Any] = []
+        self.incoming: asyncio.Queue[aiohttp.WSMessage | None] = asyncio.Queue()
+
+    async def send_json(
+        self,
+        data: object,
+        compress: int | None = None,  # noqa: ARG002
+        *,
+        dumps: Callable[[object], str] = json.dumps,
+    ) -> None:
+        """Record a sent JSON frame.
+
+        Raises:
+            ClientConnectionResetError: When the websocket is closed.
+
+        """
+        if self.closed:
+            raise aiohttp.ClientConnectionResetError
+        self.sent.append(json.loads(dumps(data)))
+
+    async def send_str(self, data: str, compress: int | None = None) -> None:  # noqa: ARG002
+        """Record a sent text frame.
+
+        Raises:
+            ClientConnectionResetError: When the websocket is closed.
+
+        """
+        if self.closed:
+            raise aiohttp.ClientConnectionResetError
+        self.sent.append(json.loads(data))
+
+    def feed(self, data: object) -> None:
+        """Queue a frame to be received by the hub."""
+        self.incoming.put_nowait(
+            aiohttp.WSMessage(aiohttp.WSMsgType.TEXT, json.dumps(data), None)
+        )
+
+    async def close(self) -> bool:
+        """Close the fake websocket."""
+        self.closed = True
+        self.incoming.put_nowait(None)
+        return True
+
+    def __aiter__(self) -> FakeWebSocket:
+        """Iterate over the received frames."""
+        return self
+
+    async def __anext__(self) -> aiohttp.WSMessage:
+        """Return the next received frame.
+
+        Raises:
+            StopAsyncIteration: When the websocket is closed.
+
+        """
+        msg = await self.incoming.get()
+        if msg is None:
+            raise StopAsyncIteration
+        return msg
+
+
+@pytest.fixture
+def websockets() -> list[FakeWebSocket]:
+    """Return the list of websockets opened by the fake session."""
+    return []
+
+
+@pytest.fixture
+def session(websockets: list[FakeWebSocket]) -> Mock:
+    """Return a fake client session opening fake websockets."""
+
+    def ws_connect(*_: object, **__: object) -> FakeWebSocket:
+        websockets.append(ws := FakeWebSocket())
+        return ws
+
+    session = Mock(spec=aiohttp.ClientSession)
+    session.ws_connect = AsyncMock(side_effect=ws_connect)
+    return session
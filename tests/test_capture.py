@@ -0,0 +1,65 @@
+"""Tests for recording and replaying the websocket traffic."""
+
+import asyncio
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from eheimdigital.capture import read_capture
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.types import EheimDeviceType, FrameDirection, MsgTitle
+
+from .conftest import FakeWebSocket, load_fixture
+
+HEATER_MAC = "44:17:93:28:DA:12"
+
+
+@pytest.mark.parametrize("name", ["traffic.capture", "traffic.capture.gz"])
+async def test_record_and_replay(
+    session: Mock, websockets: list[FakeWebSocket], tmp_path: Path, name: str
+) -> None:
+    """Tests that a replayed capture rebuilds the state of the recorded hub."""
+    path = tmp_path / name
+    hub = EheimDigitalHub(session=session, capture_path=path)
+    await hub.open_websocket()
+    websockets[0].feed({
+        **load_fixture("usrdta_heater.json"),
+        "from": HEATER_MAC,
+        "version": EheimDeviceType.VERSION_EHEIM_EXT_HEATER,
+    })
+    websockets[0].feed(load_fixture("heater_data.json"))
+    await asyncio.sleep(0.01)
+    await hub.devices[HEATER_MAC].update()
+    await hub.close()
+
+    records = list(read_capture(path))
+    assert [record.direction for record in records] == [
+        FrameDirection.INBOUND,
+        FrameDirection.INBOUND,
+        FrameDirection.OUTBOUND,
+    ]
+    assert records[0].time <= records[1].time <= records[2].time
+
+    replayed = EheimDigitalHub(session=Mock())
+    result = await replayed.replay(path, speed=None)
+    assert (result.frames, result.packets, result.sent) == (2, 2, 1)
+    assert replayed.as_dict() == hub.as_dict()
+
+
+async def test_replay_speed(tmp_path: Path) -> None:
+    """Tests that frames are replayed at the recorded pace, sped up."""
+    path = tmp_path / "traffic.capture"
+    _ = path.write_text(
+        "# eheimdigital eheimdigital.local 2026-01-01T00:00:00+00:00\n"
+        f'0.000000 < {{"title": "{MsgTitle.MESH_NETWORK}", "from": "AA", "clientList": []}}\n'
+        f'0.500000 < {{"title": "{MsgTitle.MESH_NETWORK}", "from": "AA", "clientList": []}}\n'
+        "# eheimdigital eheimdigital.local 2026-01-02T00:00:00+00:00\n"
+        f'0.100000 < {{"title": "{MsgTitle.MESH_NETWORK}", "from": "AA", "clientList": []}}\n',
+        encoding="utf8",
+    )
+    hub = EheimDigitalHub(session=Mock())
+    result = await hub.replay(path, speed=10.0)
+    assert result.frames == 3  # noqa: PLR2004
+    assert result.span == pytest.approx(0.5)
+    assert 0.05 <= result.elapsed < 0.5  # noqa: PLR2004
@@ -0,0 +1,47 @@
+"""Tests for the JSON codecs."""
+
+import asyncio
+from collections.abc import Callable
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from eheimdigital.codec import (
+    JsonDumps,
+    JsonLoads,
+    msgspec_codec,
+    orjson_codec,
+    stdlib_codec,
+)
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.types import MsgTitle
+
+from .conftest import FakeWebSocket, load_fixture
+
+
+@pytest.mark.parametrize("codec", [stdlib_codec, orjson_codec, msgspec_codec])
+def test_codec_roundtrip(codec: Callable[[], tuple[JsonLoads, JsonDumps]]) -> None:
+    """Tests that every codec round-trips packets with enum titles."""
+    try:
+        loads, dumps = codec()
+    except ImportError:
+        pytest.skip("codec not installed")
+    packet = {**load_fixture("heater_data.json"), "title": MsgTitle.HEATER_DATA}
+    encoded = dumps([packet])
+    assert isinstance(encoded, str)
+    assert loads(encoded) == json.loads(json.dumps([packet]))
+
+
+async def test_hub_codec(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that the hub uses the given codec for sending and receiving."""
+    loads = Mock(side_effect=json.loads)
+    dumps = Mock(side_effect=json.dumps)
+    hub = EheimDigitalHub(session=session, json_loads=loads, json_dumps=dumps)
+    await hub.open_websocket()
+    await hub.request_usrdta("ALL")
+    dumps.assert_called_once()
+    websockets[0].feed({"title": MsgTitle.MESH_NETWORK, "from": "AA", "clientList": []})
+    await asyncio.sleep(0.01)
+    loads.assert_called_once()
+    await hub.close()
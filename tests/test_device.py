@@ -0,0 +1,302 @@
+"""Tests for the EHEIM.digital devices."""
+
+import asyncio
+import gc
+from typing import Any
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from eheimdigital.classic_led_ctrl import EheimDigitalClassicLEDControl
+from eheimdigital.filter import EheimDigitalFilter
+from eheimdigital.heater import EheimDigitalHeater
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.simulator import SimulatedDevice
+from eheimdigital.types import (
+    EheimDeviceType,
+    FieldChange,
+    FilterModeProf,
+    MsgTitle,
+    UsrDtaPacket,
+)
+
+from .conftest import FakeWebSocket, load_fixture
+
+HEATER_MAC = "44:17:93:28:DA:12"
+
+
+async def heater_hub(**kwargs: Any) -> EheimDigitalHub:  # noqa: ANN401
+    """Return a hub with a heater."""
+    hub = EheimDigitalHub(**{"session": Mock(), **kwargs})
+    await hub.add_device(
+        UsrDtaPacket({
+            **load_fixture("usrdta_heater.json"),
+            "from": HEATER_MAC,
+            "version": EheimDeviceType.VERSION_EHEIM_EXT_HEATER,
+        })
+    )
+    return hub
+
+
+async def test_parse_message_changes() -> None:
+    """Tests that parsing a packet returns the changed fields only."""
+    hub = await heater_hub()
+    heater = hub.devices[HEATER_MAC]
+    assert isinstance(heater, EheimDigitalHeater)
+    heater_data = load_fixture("heater_data.json")
+
+    changes = await heater.parse_message(heater_data)
+    assert changes is not None
+    assert changes["isTemp"] == FieldChange(None, 249)
+    assert await heater.parse_message(dict(heater_data)) == {}
+    assert await heater.parse_message({**heater_data, "isTemp": 251}) == {
+        "isTemp": FieldChange(249, 251)
+    }
+    assert heater.heater_data is not None
+    assert heater.heater_data["isTemp"] == 251  # noqa: PLR2004
+    assert await heater.parse_message({"title": MsgTitle.CCV}) is None
+
+
+async def test_unchanged_packets_are_suppressed() -> None:
+    """Tests that identical packets do not reach callbacks and subscribers."""
+    hub = await heater_hub()
+    hub.receive_callback = AsyncMock()
+    subscriber = AsyncMock()
+    _ = hub.devices[HEATER_MAC].subscribe(subscriber, title=MsgTitle.HEATER_DATA)
+    heater_data = load_fixture("heater_data.json")
+
+    await hub.parse_message(heater_data)
+    await hub.parse_message(dict(heater_data))
+    await hub.parse_message({**heater_data, "sollTemp": 260})
+    assert hub.receive_callback.await_count == 2  # noqa: PLR2004
+    assert subscriber.await_count == 2  # noqa: PLR2004
+    assert subscriber.await_args.args[0].changes == {"sollTemp": FieldChange(250, 260)}
+
+
+async def test_usrdta_changes() -> None:
+    """Tests that a changed USRDTA packet updates the cached device properties."""
+    hub = await heater_hub()
+    heater = hub.devices[HEATER_MAC]
+    usrdta = dict(heater.usrdta)
+    assert heater.name == usrdta["name"]
+    assert await hub.parse_usrdta(UsrDtaPacket(**usrdta)) == {}
+    changes = await hub.parse_usrdta(UsrDtaPacket(**{**usrdta, "name": "Heizer"}))
+    assert changes == {"name": FieldChange(usrdta["name"], "Heizer")}
+    assert heater.name == "Heizer"
+    assert {type(title) for title in heater.received_at} == {str}
+
+
+async def test_usrdta_light_config() -> None:
+    """Tests that a changed USRDTA packet updates the LED bar configuration."""
+    hub = EheimDigitalHub(session=Mock())
+    usrdta = load_fixture("usrdta_classic_led_ctrl.json")
+    await hub.add_device(UsrDtaPacket(usrdta))
+    light = hub.devices[usrdta["from"]]
+    assert isinstance(light, EheimDigitalClassicLEDControl)
+    assert light.tankconfig == [[], ["CLASSIC_DAYLIGHT"]]
+    assert light.power == [[], [17]]
+
+    _ = await hub.parse_usrdta(
+        UsrDtaPacket({
+            **usrdta,
+            "tankconfig": '[["CLASSIC_DAYLIGHT"],["CLASSIC_DAYLIGHT"]]',
+            "power": "[[17],[17]]",
+        })
+    )
+    assert light.tankconfig == [["CLASSIC_DAYLIGHT"], ["CLASSIC_DAYLIGHT"]]
+    assert light.power == [[17], [17]]
+
+
+async def test_coalesced_writes(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that setter calls within the write window are sent as one packet."""
+    hub = await heater_hub(session=session, write_coalesce_window=0.0)
+    heater = hub.devices[HEATER_MAC]
+    assert isinstance(heater, EheimDigitalHeater)
+    await hub.open_websocket()
+    await hub.parse_message(load_fixture("heater_data.json"))
+
+    _ = await asyncio.gather(
+        heater.set_target_temperature(24),
+        heater.set_hysteresis(0.5, 0.5),
+        heater.set_target_temperature(26),
+    )
+    assert len(websockets[0].sent) == 1
+    packet = websockets[0].sent[0]
+    assert packet["title"] == "SET_EHEATER_PARAM"
+    assert packet["sollTemp"] == 260  # noqa: PLR2004
+    assert packet["hystLow"] == packet["hystHigh"] == 5  # noqa: PLR2004
+    assert not heater.pending_writes
+
+    await heater.set_active(active=False)
+    assert len(websockets[0].sent) == 2  # noqa: PLR2004
+    await hub.close()
+
+
+async def test_coalesced_write_failure(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that a failed coalesced write without waiting callers is not reported."""
+    hub = await heater_hub(session=session, write_coalesce_window=0.0)
+    heater = hub.devices[HEATER_MAC]
+    assert isinstance(heater, EheimDigitalHeater)
+    await hub.open_websocket()
+    await hub.parse_message(load_fixture("heater_data.json"))
+    exception_handler = Mock()
+    hub.loop.set_exception_handler(exception_handler)
+    _ = await websockets[0].close()
+
+    task = asyncio.create_task(heater.set_target_temperature(24))
+    await asyncio.sleep(0)
+    _ = task.cancel()
+    await asyncio.sleep(0.01)
+    assert not heater.pending_writes
+    del task
+    _ = gc.collect()
+    exception_handler.assert_not_called()
+    hub.loop.set_exception_handler(None)
+    await hub.close()
+
+
+async def test_optimistic_writes(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that written values are shown until the device disagrees."""
+    rollback_callback = AsyncMock()
+    hub = await heater_hub(
+        session=session,
+        optimistic=True,
+        optimistic_timeout=0.05,
+        rollback_callback=rollback_callback,
+    )
+    heater = hub.devices[HEATER_MAC]
+    assert isinstance(heater, EheimDigitalHeater)
+    await hub.open_websocket()
+    heater_data = load_fixture("heater_data.json")
+    await hub.parse_message(heater_data)
+
+    await heater.set_target_temperature(26)
+    assert heater.target_temperature == 26  # noqa: PLR2004
+    assert websockets[0].sent[-1]["sollTemp"] == 260  # noqa: PLR2004
+    await hub.parse_message({**heater_data, "sollTemp": 260})
+    assert not heater.optimistic_writes
+
+    await heater.set_target_temperature(27)
+    await hub.parse_message({**heater_data, "sollTemp": 260})
+    await asyncio.sleep(0)
+    assert heater.target_temperature == 26  # noqa: PLR2004
+    rollback_callback.assert_awaited_once()
+    assert rollback_callback.await_args.args[0].changes == {
+        "sollTemp": FieldChange(270, 260)
+    }
+
+    await heater.set_active(active=False)
+    assert heater.is_active is False
+    await asyncio.sleep(0.1)
+    assert heater.is_active is True
+    assert rollback_callback.await_count == 2  # noqa: PLR2004
+    await hub.close()
+
+
+async def test_optimistic_filter_mode(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that setting the filter mode shows the mode and rolls it back."""
+    rollback_callback = AsyncMock()
+    hub = EheimDigitalHub(
+        session=session, optimistic=True, rollback_callback=rollback_callback
+    )
+    simulated = SimulatedDevice(EheimDeviceType.VERSION_EHEIM_EXT_FILTER, 0)
+    await hub.add_device(UsrDtaPacket(**simulated.usrdta))
+    filter_data = simulated.packets[MsgTitle.FILTER_DATA]
+    await hub.parse_message(filter_data)
+    device = hub.devices[simulated.mac_address]
+    assert isinstance(device, EheimDigitalFilter)
+    await hub.open_websocket()
+
+    await device.set_filter_mode(FilterModeProf.PULSE)
+    assert websockets[0].sent[-1]["title"] == "START_FILTER_PULSE_MODE"
+    assert device.filter_mode == FilterModeProf.PULSE
+    await hub.parse_message(filter_data)
+    await asyncio.sleep(0)
+    assert device.filter_mode == FilterModeProf(filter_data["pumpMode"])
+    rollback_callback.assert_awaited_once()
+    assert rollback_callback.await_args.args[0].changes == {
+        "pumpMode": FieldChange(FilterModeProf.PULSE, filter_data["pumpMode"])
+    }
+    await hub.close()
+
+
+async def test_optimistic_filter_mode_flags(session: Mock) -> None:
+    """Tests that the filter mode is confirmed and shown apart from its flag bits."""
+    rollback_callback = AsyncMock()
+    hub = EheimDigitalHub(
+        session=session, optimistic=True, rollback_callback=rollback_callback
+    )
+    simulated = SimulatedDevice(EheimDeviceType.VERSION_EHEIM_EXT_FILTER, 0)
+    await hub.add_device(UsrDtaPacket(**simulated.usrdta))
+    filter_data = {
+        **simulated.packets[MsgTitle.FILTER_DATA],
+        "pumpMode": 0x100 | FilterModeProf.MANUAL,
+    }
+    await hub.parse_message(filter_data)
+    device = hub.devices[simulated.mac_address]
+    assert isinstance(device, EheimDigitalFilter)
+    await hub.open_websocket()
+
+    await device.set_filter_mode(FilterModeProf.PULSE)
+    assert device.filter_data is not None
+    assert device.filter_data["pumpMode"] == 0x100 | FilterModeProf.PULSE
+    await hub.parse_message({**filter_data, "pumpMode": 0x200 | FilterModeProf.PULSE})
+    await asyncio.sleep(0)
+    assert not device.optimistic_writes
+    assert device.filter_mode == FilterModeProf.PULSE
+    rollback_callback.assert_not_awaited()
+    await hub.close()
+
+
+async def test_turn_on_keeps_ccv(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that turn_on does not change the CCV packet before the device does."""
+    hub = EheimDigitalHub(session=session)
+    usrdta = UsrDtaPacket(load_fixture("usrdta_classic_led_ctrl.json"))
+    await hub.add_device(usrdta)
+    led = hub.devices[usrdta["from"]]
+    assert isinstance(led, EheimDigitalClassicLEDControl)
+    await hub.open_websocket()
+    await hub.parse_message({
+        "title": MsgTitle.CCV,
+        "from": usrdta["from"],
+        "currentValues": [0, 0],
+    })
+
+    await led.turn_on(80, 1)
+    assert websockets[0].sent[-1]["currentValues"] == [0, 80]
+    assert led.ccv is not None
+    assert led.ccv["currentValues"] == [0, 0]
+    await hub.close()
+
+
+async def test_refresh_stale(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that only packets older than their time to live are requested."""
+    hub = await heater_hub(session=session)
+    heater = hub.devices[HEATER_MAC]
+    await hub.open_websocket()
+    with patch("eheimdigital.device.monotonic", return_value=1000.0) as clock:
+        assert heater.is_stale(MsgTitle.HEATER_DATA, 60.0)
+        await hub.parse_message(load_fixture("heater_data.json"))
+        clock.return_value += 30.0
+        assert heater.age(MsgTitle.HEATER_DATA) == pytest.approx(30.0)
+        assert not heater.is_stale(MsgTitle.HEATER_DATA, 60.0)
+
+        result = await hub.refresh_stale({MsgTitle.HEATER_DATA: 60.0})
+        assert not result.updated
+        assert not websockets[0].sent
+
+        clock.return_value += 60.0
+        result = await hub.refresh_stale({MsgTitle.HEATER_DATA: 60.0})
+        assert result.updated == {HEATER_MAC}
+        assert [packet["title"] for packet in websockets[0].sent] == [
+            MsgTitle.GET_EHEATER_DATA
+        ]
+    await hub.close()
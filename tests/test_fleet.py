@@ -0,0 +1,36 @@
+"""Tests for the EHEIM.digital fleet."""
+
+from unittest.mock import Mock
+
+from eheimdigital.fleet import EheimDigitalFleet
+from eheimdigital.types import UsrDtaPacket
+
+from .conftest import FakeWebSocket, load_fixture
+
+
+async def test_fleet(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests managing several hubs with one session."""
+    fleet = EheimDigitalFleet(session=session, stagger=0.001)
+    first = fleet.add_hub("aquarium1.local")
+    second = fleet.add_hub("aquarium2.local")
+    assert fleet.add_hub("aquarium1.local") is first
+    assert first.session is second.session is session
+
+    usrdta = load_fixture("usrdta_heater.json")
+    await first.add_device(UsrDtaPacket(usrdta))
+    await second.add_device(UsrDtaPacket(usrdta))
+    assert set(fleet.devices) == {
+        ("aquarium1.local", usrdta["from"]),
+        ("aquarium2.local", usrdta["from"]),
+    }
+
+    assert await fleet.connect() == {"aquarium1.local": None, "aquarium2.local": None}
+    assert len(websockets) == len(fleet.hubs)
+    results = await fleet.update()
+    assert results["aquarium1.local"].updated == {usrdta["from"]}
+
+    await fleet.remove_hub("aquarium2.local")
+    assert websockets[1].closed
+    await fleet.close()
+    assert websockets[0].closed
+    session.close.assert_not_called()
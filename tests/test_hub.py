@@ -1,27 +1,549 @@
 """Tests for the EHEIM.digital hub."""
 
-import json
-from pathlib import Path
-from unittest.mock import Mock
+import asyncio
+from unittest.mock import AsyncMock, Mock
 
 import pytest
 
-from eheimdigital.hub import EheimDigitalHub
-from eheimdigital.types import UsrDtaPacket
+from eheimdigital.heartbeat import HeartbeatOptions
+from eheimdigital.hub import BatchOptions, EheimDigitalHub
+from eheimdigital.types import (
+    ConnectionState,
+    EheimDeviceType,
+    EheimDigitalClientError,
+    EheimDigitalTimeoutError,
+    MsgTitle,
+    QueueOverflowPolicy,
+    UsrDtaPacket,
+)
+
+from .conftest import FakeWebSocket, load_fixture
 
 
 @pytest.mark.parametrize("fixture", ["usrdta_heater.json"])
-def test_add_device(fixture: str) -> None:
+async def test_add_device(fixture: str) -> None:
     """Tests adding a device."""
-    usrdta = UsrDtaPacket(
-        json.loads(
-            (Path(__file__).parent / "fixtures" / fixture).read_text(encoding="utf8")
-        )
-    )
-    hub = EheimDigitalHub(Mock())
-    hub.add_device(usrdta)
+    usrdta = UsrDtaPacket(load_fixture(fixture))
+    hub = EheimDigitalHub(session=Mock())
+    await hub.add_device(usrdta)
     assert len(hub.devices) == 1
     assert usrdta["from"] in hub.devices
     assert (device := hub.devices[usrdta["from"]])
     assert device.mac_address == usrdta["from"]
     assert device.device_type == usrdta["version"]
+
+
+@pytest.mark.parametrize("attempt", [0, 1, 5, 100])
+async def test_reconnect_delay(attempt: int) -> None:  # noqa: RUF029
+    """Tests that the reconnect backoff is jittered and capped."""
+    hub = EheimDigitalHub(
+        session=Mock(), reconnect_min_delay=1.0, reconnect_max_delay=30.0
+    )
+    delay = min(30.0, 2.0**attempt)
+    for _ in range(20):
+        assert delay / 2 <= hub.reconnect_delay(attempt) <= delay
+
+
+async def test_supervisor_reconnects_and_resyncs(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that a dropped connection is restored and the devices are resynced."""
+    states: list[ConnectionState] = []
+    hub = EheimDigitalHub(
+        session=session,
+        connection_state_callback=AsyncMock(side_effect=states.append),
+        reconnect_min_delay=0.001,
+        reconnect_max_delay=0.001,
+    )
+    await hub.add_device(UsrDtaPacket(load_fixture("usrdta_heater.json")))
+    await hub.connect()
+    assert hub.connection_state == ConnectionState.CONNECTED
+
+    await websockets[0].close()
+    async with asyncio.timeout(1):
+        while websockets[-1] is websockets[0] or len(websockets[-1].sent) < 2:  # noqa: ASYNC110, PLR2004
+            await asyncio.sleep(0.001)
+
+    assert states == [
+        ConnectionState.CONNECTING,
+        ConnectionState.CONNECTED,
+        ConnectionState.RECONNECTING,
+        ConnectionState.CONNECTED,
+    ]
+    assert websockets[1].sent[0]["title"] == MsgTitle.GET_USRDTA
+    assert websockets[1].sent[1]["title"] == "REQ_CCV"
+
+    await hub.close()
+    assert hub.connection_state == ConnectionState.DISCONNECTED
+
+
+async def test_batch_packets(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that packets sent in the same loop iteration share one frame."""
+    hub = EheimDigitalHub(session=session, batching=BatchOptions(max_packets=2))
+    await hub.open_websocket()
+    _ = await asyncio.gather(
+        hub.request_usrdta("AA"), hub.request_usrdta("BB"), hub.request_usrdta("CC")
+    )
+    assert [packet["to"] for packet in websockets[0].sent[0]] == ["AA", "BB"]
+    assert websockets[0].sent[1]["to"] == "CC"
+
+    websockets[0].feed({"title": MsgTitle.MESH_NETWORK, "from": "BB", "clientList": []})
+    await asyncio.sleep(0.01)
+    assert hub.batch_frames_supported is None
+
+    websockets[0].feed({**load_fixture("usrdta_heater.json"), "from": "BB"})
+    await asyncio.sleep(0.01)
+    assert hub.batch_frames_supported
+    await hub.close()
+
+
+async def test_batch_probe_timeout(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests resending the packets of an unanswered array frame one by one."""
+    hub = EheimDigitalHub(session=session, batching=BatchOptions(probe_timeout=0.01))
+    await hub.open_websocket()
+    _ = await asyncio.gather(hub.request_usrdta("AA"), hub.request_usrdta("BB"))
+    assert [packet["to"] for packet in websockets[0].sent[0]] == ["AA", "BB"]
+
+    async with asyncio.timeout(1):
+        while len(websockets[0].sent) == 1:  # noqa: ASYNC110
+            await asyncio.sleep(0.001)
+    assert [frame["to"] for frame in websockets[0].sent[1:]] == ["AA", "BB"]
+    websockets[0].feed({"title": MsgTitle.USRDTA, "from": "AA", "to": "USER"})
+    await asyncio.sleep(0.01)
+    assert hub.batch_frames_supported is False
+    await hub.close()
+
+
+async def test_batch_probe_unanswered(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests probing again when the devices answer neither the array nor single frames."""
+    hub = EheimDigitalHub(session=session, batching=BatchOptions(probe_timeout=0.01))
+    await hub.open_websocket()
+    _ = await asyncio.gather(hub.request_usrdta("AA"), hub.request_usrdta("BB"))
+    await asyncio.sleep(0.05)
+    assert hub.batch_frames_supported is None
+    assert [frame["to"] for frame in websockets[0].sent[1:]] == ["AA", "BB"]
+
+    _ = await asyncio.gather(hub.request_usrdta("CC"), hub.request_usrdta("DD"))
+    assert [packet["to"] for packet in websockets[0].sent[3]] == ["CC", "DD"]
+    await hub.close()
+
+
+async def test_batch_probe_set_packets(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that packets without a response are not part of the probe."""
+    hub = EheimDigitalHub(session=session, batching=BatchOptions(probe_timeout=0.01))
+    await hub.open_websocket()
+    set_packet = {"title": "SET_TEST", "to": "AA", "from": "USER"}
+    _ = await asyncio.gather(
+        hub.request_usrdta("AA"),
+        hub.send_packet(set_packet),
+        hub.request_usrdta("BB"),
+    )
+    assert websockets[0].sent[0] == set_packet
+    assert [packet["to"] for packet in websockets[0].sent[1]] == ["AA", "BB"]
+
+    await asyncio.sleep(0.05)
+    assert websockets[0].sent.count(set_packet) == 1
+    await hub.close()
+
+
+async def test_batch_packets_fallback(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests falling back to single frames when the hub drops array frames."""
+    hub = EheimDigitalHub(
+        session=session,
+        batching=BatchOptions(probe_attempts=1),
+        reconnect_min_delay=0.001,
+        reconnect_max_delay=0.001,
+    )
+    await hub.connect()
+    _ = await asyncio.gather(hub.request_usrdta("AA"), hub.request_usrdta("BB"))
+    assert isinstance(websockets[0].sent[0], list)
+
+    await websockets[0].close()
+    async with asyncio.timeout(1):
+        while websockets[-1] is websockets[0] or not websockets[-1].sent:  # noqa: ASYNC110
+            await asyncio.sleep(0.001)
+    assert hub.batch_frames_supported is False
+    _ = await asyncio.gather(hub.request_usrdta("AA"), hub.request_usrdta("BB"))
+    assert all(isinstance(frame, dict) for frame in websockets[-1].sent)
+    await hub.close()
+
+
+async def test_batch_probe_reconnect(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests probing again after the connection dropped during a probe."""
+    hub = EheimDigitalHub(
+        session=session,
+        batching=BatchOptions(),
+        reconnect_min_delay=0.001,
+        reconnect_max_delay=0.001,
+    )
+    await hub.connect()
+    _ = await asyncio.gather(hub.request_usrdta("AA"), hub.request_usrdta("BB"))
+    await websockets[0].close()
+    async with asyncio.timeout(1):
+        while websockets[-1] is websockets[0] or not websockets[-1].sent:  # noqa: ASYNC110
+            await asyncio.sleep(0.001)
+    assert hub.batch_frames_supported is None
+    _ = await asyncio.gather(hub.request_usrdta("CC"), hub.request_usrdta("DD"))
+    assert [packet["to"] for packet in websockets[-1].sent[-1]] == ["CC", "DD"]
+    await hub.close()
+
+
+async def test_request(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that a request resolves with the matching response packet."""
+    hub = EheimDigitalHub(session=session)
+    usrdta = UsrDtaPacket(load_fixture("usrdta_heater.json"))
+    await hub.add_device(usrdta)
+    await hub.open_websocket()
+    device = hub.devices[usrdta["from"]]
+    request = asyncio.create_task(device.update(wait=True))
+    await asyncio.sleep(0)
+    assert not request.done()
+
+    for title in (MsgTitle.CCV, MsgTitle.CLOCK, MsgTitle.MOON, MsgTitle.CLOUD):
+        websockets[0].feed({"title": title, "from": usrdta["from"], "to": "USER"})
+    await asyncio.sleep(0.01)
+    assert not request.done()
+    websockets[0].feed({
+        "title": MsgTitle.ACCLIMATE,
+        "from": usrdta["from"],
+        "to": "USER",
+    })
+    async with asyncio.timeout(1):
+        await request
+    await hub.close()
+
+
+async def test_request_retries(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that unanswered requests are retried and then time out."""
+    hub = EheimDigitalHub(session=session)
+    await hub.open_websocket()
+    retries = 2
+    with pytest.raises(EheimDigitalTimeoutError):
+        _ = await hub.request(
+            "AA",
+            MsgTitle.GET_EHEATER_DATA,
+            expect=MsgTitle.HEATER_DATA,
+            timeout=0.01,
+            retries=retries,
+        )
+    assert len(websockets[0].sent) == retries + 1
+    assert not hub._pending_responses  # noqa: SLF001
+    await hub.close()
+
+
+async def test_update_deadline(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that an update reports devices that did not answer in time."""
+    hub = EheimDigitalHub(session=session)
+    usrdta = load_fixture("usrdta_heater.json")
+    for mac in ("AA", "BB", "CC"):
+        await hub.add_device(
+            UsrDtaPacket({
+                **usrdta,
+                "from": mac,
+                "version": EheimDeviceType.VERSION_EHEIM_EXT_HEATER,
+            })
+        )
+    hub.devices["CC"].update = AsyncMock(side_effect=EheimDigitalClientError)
+    await hub.connect()
+
+    async def answer() -> None:
+        await asyncio.sleep(0.01)
+        websockets[0].feed({"title": MsgTitle.HEATER_DATA, "from": "AA", "to": "USER"})
+
+    answer_task = asyncio.create_task(answer())
+    result = await hub.update(deadline=0.1)
+    await answer_task
+    assert result.updated == {"AA"}
+    assert result.timed_out == {"BB"}
+    assert set(result.failed) == {"CC"}
+    await hub.close()
+
+
+async def test_update_concurrency(session: Mock) -> None:
+    """Tests that device updates are dispatched concurrently up to the cap."""
+    hub = EheimDigitalHub(session=session, update_concurrency=2)
+    usrdta = load_fixture("usrdta_heater.json")
+    running = peak = 0
+
+    async def update(**_: object) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    for mac in ("AA", "BB", "CC", "DD"):
+        await hub.add_device(UsrDtaPacket({**usrdta, "from": mac}))
+        hub.devices[mac].update = update
+    await hub.connect()
+    result = await hub.update()
+    assert peak == hub.update_concurrency
+    assert result.updated == set(hub.devices)
+    await hub.close()
+
+
+@pytest.mark.parametrize(
+    ("policy", "expected"),
+    [
+        (QueueOverflowPolicy.DROP_OLDEST, ["BB", "CC"]),
+        (QueueOverflowPolicy.DROP_NEWEST, ["AA", "BB"]),
+    ],
+)
+async def test_inbound_overflow(
+    policy: QueueOverflowPolicy, expected: list[str]
+) -> None:
+    """Tests the overflow policies of the inbound queue."""
+    hub = EheimDigitalHub(session=Mock(), inbound_queue_size=2, inbound_overflow=policy)
+    for mac in ("AA", "BB", "CC"):
+        await hub.enqueue_frame({"title": MsgTitle.USRDTA, "from": mac})
+    assert hub.inbound_queue_depth == len(expected)
+    assert hub.inbound_dropped == 1
+    assert [hub.inbound.get_nowait()["from"] for _ in expected] == expected
+
+
+async def test_slow_callback_does_not_block_reading(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that frames are still read while a callback is busy."""
+    release = asyncio.Event()
+
+    async def receive_callback() -> None:
+        await release.wait()
+
+    hub = EheimDigitalHub(session=session, receive_callback=receive_callback)
+    await hub.add_device(UsrDtaPacket(load_fixture("usrdta_heater.json")))
+    await hub.open_websocket()
+    for sys_led in range(3):
+        websockets[0].feed({**load_fixture("usrdta_heater.json"), "sysLED": sys_led})
+    await asyncio.sleep(0.01)
+    assert websockets[0].incoming.empty()
+    assert hub.inbound_queue_depth == 2  # noqa: PLR2004
+    release.set()
+    await asyncio.sleep(0.01)
+    assert hub.inbound_queue_depth == 0
+    await hub.close()
+
+
+async def test_coalesced_callbacks() -> None:
+    """Tests that callbacks are called once per frame with the changed devices."""
+    receive_callback = AsyncMock()
+    changes_callback = AsyncMock()
+    hub = EheimDigitalHub(
+        session=Mock(),
+        receive_callback=receive_callback,
+        changes_callback=changes_callback,
+        coalesce_callbacks=True,
+    )
+    usrdta = load_fixture("usrdta_heater.json")
+    await hub.handle_frame([{**usrdta, "from": mac} for mac in ("AA", "BB", "CC")])
+    receive_callback.assert_awaited_once()
+    changes_callback.assert_awaited_once_with(frozenset({"AA", "BB", "CC"}))
+
+
+async def test_debounced_callbacks() -> None:
+    """Tests that callbacks are called once per debounce window."""
+    changes_callback = AsyncMock()
+    hub = EheimDigitalHub(
+        session=Mock(),
+        changes_callback=changes_callback,
+        coalesce_callbacks=True,
+        callback_debounce=0.01,
+    )
+    usrdta = load_fixture("usrdta_heater.json")
+    await hub.handle_frame({**usrdta, "from": "AA"})
+    await hub.handle_frame({**usrdta, "from": "BB"})
+    changes_callback.assert_not_awaited()
+    await asyncio.sleep(0.02)
+    changes_callback.assert_awaited_once_with(frozenset({"AA", "BB"}))
+
+
+async def test_subscribe() -> None:
+    """Tests that subscribers only get the packets they subscribed to."""
+    hub = EheimDigitalHub(session=Mock())
+    for mac in ("AA", "BB"):
+        await hub.add_device(
+            UsrDtaPacket({**load_fixture("usrdta_heater.json"), "from": mac})
+        )
+    device_callback = AsyncMock()
+    title_callback = AsyncMock()
+    all_callback = AsyncMock()
+    unsubscribe = hub.devices["AA"].subscribe(device_callback, title=MsgTitle.CCV)
+    _ = hub.subscribe(title_callback, title=MsgTitle.CLOCK)
+    _ = hub.subscribe(all_callback)
+
+    await hub.parse_message({
+        "title": MsgTitle.CCV,
+        "from": "AA",
+        "currentValues": [1, 2],
+    })
+    await hub.parse_message({
+        "title": MsgTitle.CCV,
+        "from": "BB",
+        "currentValues": [1, 2],
+    })
+    await hub.parse_message({"title": MsgTitle.CLOCK, "from": "BB"})
+    assert device_callback.await_count == 1
+    event = device_callback.await_args.args[0]
+    assert (event.mac_address, event.title) == ("AA", MsgTitle.CCV)
+    assert event.packet["currentValues"] == [1, 2]
+    assert title_callback.await_count == 1
+    assert all_callback.await_count == 3  # noqa: PLR2004
+
+    unsubscribe()
+    await hub.parse_message({
+        "title": MsgTitle.CCV,
+        "from": "AA",
+        "currentValues": [1, 2],
+    })
+    assert device_callback.await_count == 1
+    assert (None, None) in hub._subscriptions  # noqa: SLF001
+    assert ("AA", MsgTitle.CCV) not in hub._subscriptions  # noqa: SLF001
+
+
+async def test_heartbeat(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that heartbeats measure the latency and restore a dead connection."""
+    usrdta = UsrDtaPacket(load_fixture("usrdta_heater.json"))
+    hub = EheimDigitalHub(
+        session=session,
+        heartbeat=HeartbeatOptions(interval=0.01, timeout=0.01, misses=2),
+        reconnect_min_delay=0.001,
+        reconnect_max_delay=0.001,
+    )
+    await hub.add_device(usrdta)
+    await hub.connect()
+    async with asyncio.timeout(1):
+        while not websockets[0].sent:  # noqa: ASYNC110
+            await asyncio.sleep(0.001)
+    assert websockets[0].sent[0]["title"] == MsgTitle.GET_USRDTA
+    websockets[0].feed(usrdta)
+    async with asyncio.timeout(1):
+        while hub.latency.last is None:  # noqa: ASYNC110
+            await asyncio.sleep(0.001)
+    assert hub.latency.percentiles()[50] == hub.latency.last
+
+    async with asyncio.timeout(1):
+        while len(websockets) < 2:  # noqa: ASYNC110, PLR2004
+            await asyncio.sleep(0.001)
+    await hub.close()
+
+
+async def test_wait_ready(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that discovery requests all clients at once and waits for their data."""
+    hub = EheimDigitalHub(session=session, batching=BatchOptions())
+    await hub.connect()
+    websockets[0].feed({
+        "title": MsgTitle.MESH_NETWORK,
+        "from": "AA",
+        "clientList": ["AA", "BB"],
+    })
+    assert await hub.wait_ready(0.05) == {"AA", "BB"}
+    assert [packet["to"] for packet in websockets[0].sent[0]] == ["AA", "BB"]
+
+    for mac_address in ("AA", "BB"):
+        websockets[0].feed({
+            **load_fixture("heater_data.json"),
+            "from": mac_address,
+        })
+        websockets[0].feed({
+            **load_fixture("usrdta_heater.json"),
+            "from": mac_address,
+            "version": EheimDeviceType.VERSION_EHEIM_EXT_HEATER,
+        })
+    assert await hub.wait_ready(0.05) == {"AA", "BB"}
+    for mac_address in ("AA", "BB"):
+        websockets[0].feed({
+            **load_fixture("heater_data.json"),
+            "from": mac_address,
+        })
+    assert await hub.wait_ready(1) == set()
+    assert hub.ready_after is not None
+    await hub.close()
+
+
+async def test_wait_ready_without_mesh(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that the hub is not ready before its mesh network is known again."""
+    hub = EheimDigitalHub(
+        session=session, reconnect_min_delay=0.001, reconnect_max_delay=0.001
+    )
+    await hub.connect()
+    with pytest.raises(EheimDigitalTimeoutError):
+        _ = await hub.wait_ready(0.01)
+
+    websockets[0].feed({"title": MsgTitle.MESH_NETWORK, "from": "AA", "clientList": []})
+    websockets[0].feed({
+        **load_fixture("usrdta_heater.json"),
+        "from": "AA",
+        "version": EheimDeviceType.VERSION_EHEIM_EXT_HEATER,
+    })
+    websockets[0].feed({**load_fixture("heater_data.json"), "from": "AA"})
+    assert await hub.wait_ready(1) == set()
+
+    await websockets[0].close()
+    async with asyncio.timeout(1):
+        while len(websockets) < 2:  # noqa: ASYNC110, PLR2004
+            await asyncio.sleep(0.001)
+    assert not hub.mesh_members
+    assert hub.ready_after is None
+    with pytest.raises(EheimDigitalTimeoutError):
+        _ = await hub.wait_ready(0.01)
+    await hub.close()
+
+
+async def test_deduplicate_requests(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that identical outstanding GET requests are only sent once."""
+    hub = EheimDigitalHub(session=session)
+    await hub.open_websocket()
+    first, second = (
+        asyncio.create_task(
+            hub.request("AA", MsgTitle.GET_CLOCK, expect=MsgTitle.CLOCK)
+        )
+        for _ in range(2)
+    )
+    await hub.poll("AA", MsgTitle.GET_CLOCK, expect=MsgTitle.CLOCK)
+    await asyncio.sleep(0.01)
+    assert len(websockets[0].sent) == 1
+    assert hub.deduplicated_requests == 2  # noqa: PLR2004
+
+    websockets[0].feed({"title": MsgTitle.CLOCK, "from": "AA"})
+    assert await first == await second
+    await hub.poll("AA", MsgTitle.GET_CLOCK, expect=MsgTitle.CLOCK)
+    assert len(websockets[0].sent) == 2  # noqa: PLR2004
+    await hub.close()
+
+
+async def test_deduplicate_requests_unsent(
+    session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that requests that were not sent do not suppress the next ones."""
+    hub = EheimDigitalHub(session=session)
+    await hub.request_usrdta("AA")
+    await hub.open_websocket()
+    await hub.request_usrdta("AA")
+    assert len(websockets[0].sent) == 1
+
+    await websockets[0].close()
+    with pytest.raises(EheimDigitalClientError):
+        await hub.request_usrdta("BB")
+    await hub.open_websocket()
+    await hub.request_usrdta("BB")
+    assert websockets[1].sent[0]["to"] == "BB"
+
+    await hub.set_connection_state(ConnectionState.RECONNECTING)
+    await hub.set_connection_state(ConnectionState.CONNECTED)
+    await hub.request_usrdta("BB")
+    assert len(websockets[1].sent) == 2  # noqa: PLR2004
+    await hub.close()
@@ -0,0 +1,23 @@
+"""Tests for the import time of the package."""
+
+import pytest
+
+from benchmarks.importtime import import_times
+
+HEAVY_MODULES = ("aiohttp", "yarl")
+DEVICE_MODULES = (
+    "eheimdigital.autofeeder",
+    "eheimdigital.classic_led_ctrl",
+    "eheimdigital.classic_vario",
+    "eheimdigital.filter",
+    "eheimdigital.heater",
+    "eheimdigital.ph_control",
+)
+
+
+@pytest.mark.parametrize("module", ["eheimdigital.types", "eheimdigital.hub"])
+def test_lazy_imports(module: str) -> None:
+    """Tests that importing the package does not import aiohttp or the devices."""
+    imported = set(import_times(module))
+    assert module in imported
+    assert not imported.intersection(HEAVY_MODULES + DEVICE_MODULES)
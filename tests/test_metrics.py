@@ -0,0 +1,100 @@
+"""Tests for the hub metrics."""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import aiohttp
+
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.metrics import MetricsRegistry
+from eheimdigital.types import EheimDeviceType, MsgTitle
+
+from .conftest import FakeWebSocket, load_fixture
+
+
+def test_render() -> None:
+    """Tests the Prometheus text format of counters, gauges and histograms."""
+    registry = MetricsRegistry()
+    counter = registry.counter("packets_total", "Packets.", ("title",))
+    counter.inc("A")
+    counter.inc('B"\n', amount=2)
+    _ = registry.gauge("depth", "Depth.", lambda: 1.5)
+    histogram = registry.histogram("duration_seconds", "Duration.", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    assert registry.render().splitlines() == [
+        "# HELP packets_total Packets.",
+        "# TYPE packets_total counter",
+        'packets_total{title="A"} 1',
+        'packets_total{title="B\\"\\n"} 2',
+        "# HELP depth Depth.",
+        "# TYPE depth gauge",
+        "depth 1.5",
+        "# HELP duration_seconds Duration.",
+        "# TYPE duration_seconds histogram",
+        'duration_seconds_bucket{le="0.1"} 1',
+        'duration_seconds_bucket{le="1"} 2',
+        'duration_seconds_bucket{le="+Inf"} 3',
+        "duration_seconds_sum 5.55",
+        "duration_seconds_count 3",
+    ]
+
+
+async def test_hub_metrics(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that the hub counts the packets and frames it receives and sends."""
+    hub = EheimDigitalHub(
+        session=session, collect_metrics=True, receive_callback=AsyncMock()
+    )
+    await hub.open_websocket()
+    websockets[0].feed([
+        {
+            **load_fixture("usrdta_heater.json"),
+            "from": "44:17:93:28:DA:12",
+            "version": EheimDeviceType.VERSION_EHEIM_EXT_HEATER,
+        },
+        load_fixture("heater_data.json"),
+    ])
+    await asyncio.sleep(0.01)
+    await hub.request_usrdta("ALL")
+
+    metrics = hub.metrics()
+    assert "eheimdigital_connected 1\n" in metrics
+    assert "eheimdigital_devices 1\n" in metrics
+    assert "eheimdigital_frames_received_total 1\n" in metrics
+    assert 'eheimdigital_packets_received_total{title="HEATER_DATA"} 1\n' in metrics
+    assert f'eheimdigital_packets_sent_total{{title="{MsgTitle.GET_USRDTA}"}} 1\n' in (
+        metrics
+    )
+    assert "eheimdigital_frame_handling_seconds_count 1\n" in metrics
+    assert 'eheimdigital_callback_seconds_count{callback="receive"} 2\n' in metrics
+    assert websockets[0].sent[-1]["title"] == MsgTitle.GET_USRDTA
+
+    await hub.close()
+    assert "eheimdigital_connected 0\n" in hub.metrics()
+
+
+async def test_metrics_disabled(session: Mock) -> None:  # noqa: RUF029
+    """Tests that without collect_metrics only the collected gauges are rendered."""
+    hub = EheimDigitalHub(session=session)
+    assert hub.hub_metrics is None
+    metrics = hub.metrics()
+    assert "eheimdigital_inbound_dropped_total 0\n" in metrics
+    assert "eheimdigital_packets_received_total" not in metrics
+
+
+async def test_serve_metrics() -> None:
+    """Tests the metrics endpoint."""
+    hub = EheimDigitalHub(session=Mock(), collect_metrics=True)
+    await hub.serve_metrics(port=0)
+    assert hub.metrics_runner is not None
+    host, port = hub.metrics_runner.addresses[0][:2]
+    async with (
+        aiohttp.ClientSession() as session,
+        session.get(f"http://{host}:{port}/metrics") as response,
+    ):
+        assert response.status == 200  # noqa: PLR2004
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert "eheimdigital_devices 0" in await response.text()
+    await hub.close()
+    assert hub.metrics_runner is None
@@ -0,0 +1,78 @@
+"""Tests for the push-aware adaptive polling."""
+
+from collections.abc import Iterator
+from unittest.mock import Mock, patch
+
+import pytest
+
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.polling import PushTracker
+from eheimdigital.types import MsgTitle, UsrDtaPacket
+
+from .conftest import FakeWebSocket, load_fixture
+
+
+@pytest.fixture
+def clock() -> Iterator[Mock]:
+    """Patch the monotonic clock of the polling module.
+
+    Yields:
+        The patched clock.
+
+    """
+    with patch("eheimdigital.polling.monotonic", return_value=1000.0) as clock:
+        yield clock
+
+
+def test_push_tracker(clock: Mock) -> None:
+    """Tests that pushed packets are polled less often until they go quiet."""
+    tracker = PushTracker(max_poll_interval=60.0)
+    tracker.solicited("AA", MsgTitle.CCV)
+    clock.return_value += 0.1
+    tracker.received("AA", MsgTitle.CCV)
+    assert not tracker.is_streaming("AA", MsgTitle.CCV)
+
+    for _ in range(3):
+        clock.return_value += 2.0
+        tracker.received("AA", MsgTitle.CCV)
+    assert tracker.is_streaming("AA", MsgTitle.CCV)
+    assert not tracker.should_poll("AA", MsgTitle.CCV)
+    assert tracker.should_poll("AA", MsgTitle.CLOCK)
+
+    clock.return_value += 5.0
+    assert not tracker.should_poll("AA", MsgTitle.CCV)
+    clock.return_value += 2.0
+    assert tracker.should_poll("AA", MsgTitle.CCV)
+
+
+def test_push_tracker_max_poll_interval(clock: Mock) -> None:
+    """Tests that streaming packets are still polled every max_poll_interval."""
+    tracker = PushTracker(max_poll_interval=10.0)
+    tracker.solicited("AA", MsgTitle.CCV)
+    for _ in range(12):
+        clock.return_value += 1.0
+        tracker.received("AA", MsgTitle.CCV)
+    assert tracker.is_streaming("AA", MsgTitle.CCV)
+    assert tracker.should_poll("AA", MsgTitle.CCV)
+
+
+async def test_adaptive_polling(
+    clock: Mock, session: Mock, websockets: list[FakeWebSocket]
+) -> None:
+    """Tests that the hub skips polls for pushed packets."""
+    hub = EheimDigitalHub(session=session, adaptive_polling=True)
+    usrdta = UsrDtaPacket(load_fixture("usrdta_heater.json"))
+    await hub.add_device(usrdta)
+    await hub.open_websocket()
+    for _ in range(3):
+        clock.return_value += 10.0
+        await hub.parse_message({
+            "title": MsgTitle.CCV,
+            "from": usrdta["from"],
+            "currentValues": [0, 0],
+        })
+    await hub.devices[usrdta["from"]].update()
+    titles = {packet["title"] for packet in websockets[0].sent}
+    assert MsgTitle.REQ_CCV not in titles
+    assert MsgTitle.GET_CLOCK in titles
+    await hub.close()
@@ -0,0 +1,47 @@
+"""Tests for the outbound rate limiter."""
+
+import asyncio
+from unittest.mock import Mock
+
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.ratelimit import RateLimiter
+from eheimdigital.types import MsgTitle
+
+from .conftest import FakeWebSocket
+
+
+async def test_token_bucket() -> None:
+    """Tests that bursts pass and later packets wait for tokens."""
+    limiter = RateLimiter(rate=100.0, burst=2)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(4):
+        await limiter.acquire()
+    assert loop.time() - start >= 0.015  # noqa: PLR2004
+    assert limiter.wait_time > 0
+    assert limiter.waiting == 0
+
+
+async def test_in_flight_cap(session: Mock, websockets: list[FakeWebSocket]) -> None:
+    """Tests that a device gets a new request only after answering the last one."""
+    hub = EheimDigitalHub(session=session, rate_limiter=RateLimiter(max_in_flight=1))
+    await hub.open_websocket()
+    first = asyncio.create_task(
+        hub.request("AA", MsgTitle.GET_CLOCK, expect=MsgTitle.CLOCK)
+    )
+    second = asyncio.create_task(
+        hub.request("AA", MsgTitle.GET_MOON, expect=MsgTitle.MOON)
+    )
+    await asyncio.sleep(0.01)
+    assert [packet["title"] for packet in websockets[0].sent] == [MsgTitle.GET_CLOCK]
+    assert hub.rate_limiter.in_flight == {"AA": 1}
+    assert hub.rate_limiter.waiting == 1
+
+    websockets[0].feed({"title": MsgTitle.CLOCK, "from": "AA"})
+    _ = await first
+    await asyncio.sleep(0.01)
+    assert websockets[0].sent[-1]["title"] == MsgTitle.GET_MOON
+    websockets[0].feed({"title": MsgTitle.MOON, "from": "AA"})
+    _ = await second
+    assert hub.rate_limiter.in_flight == {}
+    await hub.close()
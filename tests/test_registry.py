@@ -0,0 +1,62 @@
+"""Tests for the device registry."""
+
+from typing import Any, override
+from unittest.mock import AsyncMock, Mock
+
+from eheimdigital.device import EheimDigitalDevice, packet_handler
+from eheimdigital.heater import EheimDigitalHeater
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.registry import DEVICE_CLASSES, get_device_class, register_device
+from eheimdigital.types import EheimDeviceType, FieldChange, MsgTitle, UsrDtaPacket
+
+from .conftest import load_fixture
+
+
+def test_builtin_device_classes() -> None:
+    """Tests that the built-in device classes are registered."""
+    assert (
+        get_device_class(EheimDeviceType.VERSION_EHEIM_EXT_HEATER) is EheimDigitalHeater
+    )
+    assert get_device_class(EheimDeviceType.VERSION_EHEIM_CHILLER) is EheimDigitalDevice
+    assert MsgTitle.HEATER_DATA in EheimDigitalHeater.packet_handlers
+
+
+async def test_register_device() -> None:
+    """Tests that a registered third-party device class is used by the hub."""
+
+    @register_device(EheimDeviceType.VERSION_EHEIM_CHILLER)
+    class Chiller(EheimDigitalDevice):
+        """A chiller."""
+
+        chiller_data: dict[str, Any] | None = None
+
+        @packet_handler(MsgTitle.HEATER_DATA)
+        def parse_chiller_data(self, msg: dict[str, Any]) -> dict[str, FieldChange]:
+            """Parse a chiller packet."""
+            return self.update_packet("chiller_data", msg)
+
+        @override
+        async def update(self, *, wait: bool = False) -> None:
+            """Get the new chiller state."""
+
+    try:
+        hub = EheimDigitalHub(session=Mock(), device_found_callback=AsyncMock())
+        usrdta = UsrDtaPacket({
+            **load_fixture("usrdta_heater.json"),
+            "version": EheimDeviceType.VERSION_EHEIM_CHILLER,
+        })
+        await hub.add_device(usrdta)
+        chiller = hub.devices[usrdta["from"]]
+        assert isinstance(chiller, Chiller)
+        assert hub.device_found_callback is not None
+        hub.device_found_callback.assert_awaited_once_with(
+            usrdta["from"], EheimDeviceType.VERSION_EHEIM_CHILLER
+        )
+        changes = await chiller.parse_message({
+            "title": MsgTitle.HEATER_DATA,
+            "isTemp": 100,
+        })
+        assert changes is not None
+        assert changes["isTemp"] == FieldChange(None, 100)
+    finally:
+        del DEVICE_CLASSES[EheimDeviceType.VERSION_EHEIM_CHILLER]
@@ -0,0 +1,42 @@
+"""Tests for the EHEIM.digital hub simulator."""
+
+import aiohttp
+
+from eheimdigital.heater import EheimDigitalHeater
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.simulator import SIMULATED_DEVICE_TYPES, EheimDigitalSimulator
+from eheimdigital.types import MsgTitle
+
+
+async def test_hub_against_simulator() -> None:
+    """Tests that a hub discovers, updates and writes to simulated devices."""
+    async with (
+        EheimDigitalSimulator(devices_per_type=2, push_interval=0.05, seed=1) as sim,
+        aiohttp.ClientSession() as session,
+    ):
+        assert sim.address is not None
+        hub = EheimDigitalHub(host=sim.address, session=session)
+        await hub.connect()
+        assert await hub.wait_ready(5.0) == set()
+        assert len(hub.devices) == 2 * len(SIMULATED_DEVICE_TYPES)
+        assert {device.device_type for device in hub.devices.values()} == set(
+            SIMULATED_DEVICE_TYPES
+        )
+        assert hub.main is not None
+        assert hub.main.mac_address == sim.master.mac_address
+
+        result = await hub.update(deadline=5.0)
+        assert result.updated == set(hub.devices)
+        assert not result.timed_out
+
+        heater = next(
+            device
+            for device in hub.devices.values()
+            if isinstance(device, EheimDigitalHeater)
+        )
+        await heater.set_target_temperature(27)
+        packet = await hub.request(
+            heater.mac_address, MsgTitle.GET_EHEATER_DATA, expect=MsgTitle.HEATER_DATA
+        )
+        assert packet["sollTemp"] == 270  # noqa: PLR2004
+        await hub.close()
@@ -0,0 +1,111 @@
+"""Tests for the hub snapshots."""
+
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+from eheimdigital.codec import (
+    JsonDumps,
+    JsonLoads,
+    msgspec_codec,
+    orjson_codec,
+    stdlib_codec,
+)
+from eheimdigital.heater import EheimDigitalHeater
+from eheimdigital.hub import EheimDigitalHub
+from eheimdigital.types import (
+    EheimDeviceType,
+    EheimDigitalClientError,
+    MsgTitle,
+    UsrDtaPacket,
+)
+
+from .conftest import load_fixture
+
+
+@pytest.mark.parametrize("name", ["snapshot.json", "snapshot.json.gz"])
+async def test_snapshot_roundtrip(tmp_path: Path, name: str) -> None:
+    """Tests that a restored hub has the devices and packets of the saved one."""
+    hub = EheimDigitalHub(session=Mock())
+    usrdta = UsrDtaPacket({
+        **load_fixture("usrdta_heater.json"),
+        "from": "44:17:93:28:DA:12",
+        "version": EheimDeviceType.VERSION_EHEIM_EXT_HEATER,
+    })
+    await hub.add_device(usrdta)
+    await hub.parse_message(load_fixture("heater_data.json"))
+    await hub.save_snapshot(tmp_path / name)
+
+    restored = await EheimDigitalHub.from_snapshot(tmp_path / name, session=Mock())
+    heater = restored.devices[usrdta["from"]]
+    assert isinstance(heater, EheimDigitalHeater)
+    assert restored.main is heater
+    assert heater.usrdta == usrdta
+    assert heater.heater_data == hub.devices[usrdta["from"]].as_dict()["heater_data"]
+    assert not heater.is_stale(MsgTitle.HEATER_DATA, 60.0)
+    assert heater.is_stale(MsgTitle.USRDTA, 60.0)
+
+
+@pytest.mark.parametrize("codec", [stdlib_codec, orjson_codec, msgspec_codec])
+async def test_snapshot_after_usrdta(
+    tmp_path: Path, codec: Callable[[], tuple[JsonLoads, JsonDumps]]
+) -> None:
+    """Tests saving a snapshot after a known device has sent its USRDTA again."""
+    try:
+        loads, dumps = codec()
+    except ImportError:
+        pytest.skip("codec not installed")
+    hub = EheimDigitalHub(session=Mock(), json_loads=loads, json_dumps=dumps)
+    usrdta = {
+        **load_fixture("usrdta_heater.json"),
+        "from": "44:17:93:28:DA:12",
+        "version": EheimDeviceType.VERSION_EHEIM_EXT_HEATER,
+    }
+    await hub.parse_message(usrdta)
+    await hub.parse_message(load_fixture("heater_data.json"))
+    await hub.parse_message(usrdta)
+    await hub.save_snapshot(tmp_path / "snapshot.json")
+
+    restored = await EheimDigitalHub.from_snapshot(
+        tmp_path / "snapshot.json", session=Mock(), json_loads=loads
+    )
+    heater = restored.devices[usrdta["from"]]
+    assert not heater.is_stale(MsgTitle.USRDTA, 60.0)
+    assert not heater.is_stale(MsgTitle.HEATER_DATA, 60.0)
+
+
+async def test_snapshot_stored_packets(tmp_path: Path) -> None:
+    """Tests that snapshots hold the received packets, not the displayed ones."""
+    hub = EheimDigitalHub(session=Mock(), optimistic=True)
+    usrdta = UsrDtaPacket({
+        **load_fixture("usrdta_heater.json"),
+        "from": "44:17:93:28:DA:12",
+        "version": EheimDeviceType.VERSION_EHEIM_EXT_HEATER,
+    })
+    await hub.add_device(usrdta)
+    heater_data = load_fixture("heater_data.json")
+    await hub.parse_message(heater_data)
+    heater = hub.devices[usrdta["from"]]
+    assert isinstance(heater, EheimDigitalHeater)
+    await heater.set_target_temperature(30)
+    assert heater.target_temperature == 30  # noqa: PLR2004
+    with patch.object(EheimDigitalHeater, "as_dict", return_value={}):
+        await hub.save_snapshot(tmp_path / "snapshot.json")
+    await hub.close()
+
+    restored = await EheimDigitalHub.from_snapshot(
+        tmp_path / "snapshot.json", session=Mock()
+    )
+    restored_heater = restored.devices[usrdta["from"]]
+    assert isinstance(restored_heater, EheimDigitalHeater)
+    assert restored_heater.heater_data == heater_data
+
+
+async def test_snapshot_version(tmp_path: Path) -> None:
+    """Tests that snapshots of an unknown version are rejected."""
+    path = tmp_path / "snapshot.json"
+    _ = path.write_text('{"version": 0}', encoding="utf8")
+    with pytest.raises(EheimDigitalClientError):
+        _ = await EheimDigitalHub.from_snapshot(path, session=Mock())